@@ -0,0 +1,281 @@
+"""
+End-to-end benchmark of the addon against local stub upstreams.
+
+Starts the stubs (benchmarks/stubs.py) and the app under gunicorn with a
+throwaway cache database, then drives /catalog, /stream and /resolve at a
+fixed concurrency: each endpoint first with a cold cache (every request is
+new), then warm (the same requests again). Run from the repository root:
+
+    python -m benchmarks.run --requests 200 --concurrency 20 --latency 0.1
+    python -m benchmarks.run --failure-rate 0.05 --upstream tpb:2.0 --env CACHE_BACKEND=redis
+
+Reports throughput and p50/p95/p99 latency per endpoint and cache state;
+--json writes the same numbers to a file for comparing runs.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import quote, urlsplit
+
+import aiohttp
+
+from benchmarks.stubs import add_fault_arguments, stub_settings
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Every provider is enabled so /stream exercises the whole pipeline
+BENCH_CONFIG = {
+    "rd_key": "bench-rd-token",
+    "torbox_key": "bench-tb-token",
+    "easynews_user": "bench",
+    "easynews_pass": "bench",
+}
+
+
+@dataclass
+class Result:
+    endpoint: str
+    cache: str
+    requests: int
+    errors: int
+    seconds: float
+    throughput: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def encode_config(config: dict) -> str:
+    encoded = base64.b64encode(json.dumps(config).encode()).decode().rstrip("=")
+    # The config is a single path segment
+    if "/" in encoded:
+        raise ValueError("Config encodes to a '/', change one of the values")
+    return encoded
+
+
+async def drive(session: aiohttp.ClientSession, urls: List[str], concurrency: int) -> tuple:
+    """
+    Request every URL with at most `concurrency` in flight.
+
+    Returns:
+        (latencies in ms of the successful requests, error count, wall seconds, bodies)
+    """
+    latencies: List[float] = []
+    bodies: List[Optional[dict]] = [None] * len(urls)
+    errors = 0
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in enumerate(urls):
+        queue.put_nowait(item)
+
+    async def worker():
+        nonlocal errors
+        while not queue.empty():
+            i, url = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                async with session.get(url, allow_redirects=False) as resp:
+                    body = await resp.read()
+                    # /resolve answers with a redirect to the debrid link
+                    if resp.status >= 400:
+                        errors += 1
+                        continue
+                    if resp.content_type == "application/json":
+                        bodies[i] = json.loads(body)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started, bodies
+
+
+def summarize(endpoint: str, cache: str, latencies: List[float], errors: int, seconds: float) -> Result:
+    latencies = sorted(latencies)
+    return Result(
+        endpoint=endpoint,
+        cache=cache,
+        requests=len(latencies) + errors,
+        errors=errors,
+        seconds=round(seconds, 3),
+        throughput=round(len(latencies) / seconds, 1) if seconds else 0.0,
+        p50_ms=round(percentile(latencies, 50), 1),
+        p95_ms=round(percentile(latencies, 95), 1),
+        p99_ms=round(percentile(latencies, 99), 1),
+    )
+
+
+def resolve_urls(stream_bodies: List[Optional[dict]], base_url: str) -> List[str]:
+    """
+    One /resolve link per /stream response, alternating RealDebrid and TorBox.
+    """
+    urls = []
+    for i, body in enumerate(stream_bodies):
+        links = [s["url"] for s in (body or {}).get("streams", []) if "/resolve/" in s.get("url", "")]
+        prefix = "/resolve/rd/" if i % 2 == 0 else "/resolve/tb/"
+        preferred = [link for link in links if prefix in link] or links
+        if preferred:
+            # Streams are built from the app's own base URL; keep just the path
+            urls.append(base_url + urlsplit(preferred[0]).path)
+    return urls
+
+
+async def wait_until_up(session: aiohttp.ClientSession, url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(url) as resp:
+                if resp.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+async def benchmark(args: argparse.Namespace, base_url: str) -> List[Result]:
+    config = encode_config(BENCH_CONFIG)
+    # Unique per run so a reused cache (e.g. --env CACHE_BACKEND=redis) still starts cold
+    run_id = uuid.uuid4().hex[:8]
+
+    catalog_urls = [
+        f"{base_url}/{config}/catalog/movie/stashdb_search/search={quote(f'bench {run_id} {i}')}.json"
+        for i in range(args.requests)
+    ]
+    scene_ids = [str(uuid.uuid5(uuid.NAMESPACE_URL, f"{run_id}/{i}")) for i in range(args.requests)]
+    stream_urls = [f"{base_url}/{config}/stream/movie/stashdb:{scene_id}.json" for scene_id in scene_ids]
+
+    results = []
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        await wait_until_up(session, f"{base_url}/manifest.json")
+
+        workloads = [("catalog", catalog_urls), ("stream", stream_urls), ("resolve", None)]
+        stream_bodies: List[Optional[dict]] = []
+        for endpoint, urls in workloads:
+            if urls is None:
+                # Resolve the links the cold /stream pass returned
+                urls = resolve_urls(stream_bodies, base_url)
+            for cache in ("cold", "warm"):
+                latencies, errors, seconds, bodies = await drive(session, urls, args.concurrency)
+                if endpoint == "stream" and cache == "cold":
+                    stream_bodies = bodies
+                result = summarize(endpoint, cache, latencies, errors, seconds)
+                results.append(result)
+                print_result(result)
+    return results
+
+
+def print_header():
+    print(f"{'endpoint':<10}{'cache':<7}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+
+
+def print_result(r: Result):
+    print(
+        f"{r.endpoint:<10}{r.cache:<7}{r.requests:>9}{r.errors:>8}{r.throughput:>9.1f}"
+        f"{r.p50_ms:>9.1f}{r.p95_ms:>9.1f}{r.p99_ms:>9.1f}",
+        flush=True
+    )
+
+
+def app_environment(args: argparse.Namespace, workdir: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update(stub_settings(args.host, args.stub_port))
+    env.update({
+        "HOST": args.host,
+        "PORT": str(args.port),
+        "WEB_CONCURRENCY": str(args.workers),
+        "DATABASE_URL": f"sqlite+aiosqlite:///{workdir}/cache.db",
+        "LEADER_LOCK_FILE": f"{workdir}/leader.lock",
+        "LOG_LEVEL": "WARNING",
+    })
+    for override in args.env:
+        key, _, value = override.partition("=")
+        env[key] = value
+    return env
+
+
+async def main_async(args: argparse.Namespace) -> List[Result]:
+    workdir = tempfile.mkdtemp(prefix="creamio-bench-")
+    stub_args = [
+        "--host", args.host, "--port", str(args.stub_port),
+        "--latency", str(args.latency), "--jitter", str(args.jitter), "--failure-rate", str(args.failure_rate),
+    ]
+    for override in args.upstream:
+        stub_args += ["--upstream", override]
+
+    log = open(os.path.join(workdir, "app.log"), "wb")
+    stubs = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "benchmarks.stubs", *stub_args,
+        cwd=ROOT, stdout=asyncio.subprocess.DEVNULL
+    )
+    app = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "gunicorn", "main:app", "-c", "gunicorn.conf.py",
+        cwd=ROOT, env=app_environment(args, workdir), stdout=log, stderr=log
+    )
+    try:
+        print(f"Upstream latency {args.latency}s (+{args.jitter}s jitter), failure rate {args.failure_rate:.0%}, "
+              f"{args.workers} worker(s), concurrency {args.concurrency}")
+        print_header()
+        return await benchmark(args, f"http://{args.host}:{args.port}")
+    finally:
+        for process in (app, stubs):
+            if process.returncode is None:
+                process.terminate()
+                await process.wait()
+        log.close()
+        if args.keep:
+            print(f"App log and cache database kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Creamio against stub upstreams")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per endpoint and cache state")
+    parser.add_argument("--concurrency", type=int, default=10, help="Requests in flight at once")
+    parser.add_argument("--workers", type=int, default=1, help="Gunicorn workers (WEB_CONCURRENCY)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Client timeout per request (seconds)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9200, help="Port of the app")
+    parser.add_argument("--stub-port", type=int, default=9100, help="First port of the stubs")
+    parser.add_argument(
+        "--env", action="append", default=[], metavar="KEY=VALUE",
+        help="Extra app setting, repeatable (e.g. CACHE_COMPRESSION=true)"
+    )
+    parser.add_argument("--json", metavar="PATH", help="Also write the results as JSON")
+    parser.add_argument("--keep", action="store_true", help="Keep the app log and cache database")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    results = asyncio.run(main_async(args))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": [asdict(r) for r in results]}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
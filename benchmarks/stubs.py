@@ -0,0 +1,356 @@
+"""
+Local stand-ins for every upstream the addon talks to, for benchmarking.
+
+Each upstream gets its own port (like the real hosts, so the addon keeps one
+connection pool per upstream) and replays the trimmed recordings in
+fixtures/, with injected latency and failures:
+
+    python -m benchmarks.stubs --port 9100 --latency 0.05 --failure-rate 0.02 \\
+        --upstream tpb:0.8:0.1
+
+Recorded pages are personalized per request so every search looks distinct:
+"__QUERY__" becomes the search term and each infohash is re-derived from it.
+RealDebrid and TorBox keep a small in-memory library per token.
+"""
+import argparse
+import asyncio
+import hashlib
+import html
+import json
+import random
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List
+
+from aiohttp import web
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+# Upstream name -> (port offset, settings variable, path of the base URL)
+UPSTREAMS = {
+    "stashdb": (0, "STASHDB_ENDPOINT", "/graphql"),
+    "tpb": (1, "TPB_URL", ""),
+    "x1337": (2, "X1337_URL", ""),
+    "torrentgalaxy": (3, "TORRENTGALAXY_URL", ""),
+    "realdebrid": (4, "REALDEBRID_API_URL", "/rest/1.0"),
+    "torbox": (5, "TORBOX_API_URL", "/v1/api"),
+    "easynews": (6, "EASYNEWS_API_URL", "/2.0/search/solr-search/advanced"),
+}
+
+_BTIH_RE = re.compile(r"btih:([0-9a-fA-F]{40})")
+_DETAIL_HREF_RE = re.compile(r'href="/torrent/(\d+)/')
+_OPERATION_RE = re.compile(r"\bquery\s+(\w+)")
+
+
+@dataclass
+class Fault:
+    """
+    Latency (base + uniform jitter, in seconds) and failure rate injected
+    into every request to one upstream.
+    """
+    latency: float = 0.0
+    jitter: float = 0.0
+    failure_rate: float = 0.0
+
+
+def stub_settings(host: str, port: int) -> Dict[str, str]:
+    """
+    Environment variables pointing the addon at stubs started on `port` and up.
+    """
+    return {
+        variable: f"http://{host}:{port + offset}{path}"
+        for offset, variable, path in UPSTREAMS.values()
+    }
+
+
+@lru_cache(maxsize=None)
+def fixture(name: str) -> str:
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+def derive_hash(*parts: str) -> str:
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+
+def personalize(page: str, query: str, escape=html.escape) -> str:
+    """
+    Put the search term into a recorded page and derive its infohashes from it.
+    """
+    page = page.replace("__QUERY__", escape(query))
+    return _BTIH_RE.sub(lambda m: f"btih:{derive_hash(query, m.group(1))}", page)
+
+
+def fault_middleware(fault: Fault):
+    @web.middleware
+    async def middleware(request: web.Request, handler):
+        delay = fault.latency + random.uniform(0, fault.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        if fault.failure_rate and random.random() < fault.failure_rate:
+            return web.Response(status=503, text="Injected failure")
+        return await handler(request)
+    return middleware
+
+
+def _token(request: web.Request) -> str:
+    return request.headers.get("Authorization", "").removeprefix("Bearer ")
+
+
+# --- StashDB ---
+
+def _scene(scene_id: str) -> dict:
+    scene = json.loads(fixture("stashdb_scene.json"))
+    scene["id"] = scene_id
+    # Distinct titles -> distinct torrent searches per scene
+    scene["title"] = f"{scene['title']} {scene_id[:8]}"
+    return scene
+
+
+def _scenes() -> dict:
+    return json.loads(fixture("stashdb_scenes.json"))
+
+
+async def stashdb_graphql(request: web.Request) -> web.Response:
+    body = await request.json()
+    variables = body.get("variables") or {}
+    match = _OPERATION_RE.search(body.get("query", ""))
+    operation = body.get("operationName") or (match.group(1) if match else None)
+
+    if operation == "GetScenes":
+        data = {f"s{i}": _scene(variables[f"id{i}"]) for i in range(len(variables))}
+    elif operation == "GetScene":
+        data = {"findScene": _scene(variables["id"])}
+    elif operation == "FindPerformerOrScenes":
+        data = {"findPerformers": {"performers": []}, **_scenes()}
+    elif operation in ("SearchScenes", "PerformerScenes"):
+        data = _scenes()
+    else:
+        return web.json_response({"errors": [{"message": f"Unknown operation {operation}"}]})
+    return web.json_response({"data": data})
+
+
+# --- Torrent sites ---
+
+async def tpb_search(request: web.Request) -> web.Response:
+    page = personalize(fixture("tpb_search.html"), request.match_info["query"])
+    return web.Response(text=page, content_type="text/html")
+
+
+async def x1337_search(request: web.Request) -> web.Response:
+    query = request.match_info["query"]
+    page = personalize(fixture("x1337_search.html"), query)
+    # Detail pages (and so magnets) differ per search too
+    page = _DETAIL_HREF_RE.sub(lambda m: f'href="/torrent/{derive_hash(query, m.group(1))[:10]}/', page)
+    return web.Response(text=page, content_type="text/html")
+
+
+async def x1337_detail(request: web.Request) -> web.Response:
+    page = personalize(fixture("x1337_detail.html"), request.match_info["torrent_id"])
+    return web.Response(text=page, content_type="text/html")
+
+
+async def torrentgalaxy_search(request: web.Request) -> web.Response:
+    page = personalize(fixture("tgx_search.html"), request.query.get("search", ""))
+    return web.Response(text=page, content_type="text/html")
+
+
+# --- RealDebrid ---
+
+def _magnet_hash(magnet: str) -> str:
+    match = _BTIH_RE.search(magnet)
+    return match.group(1).lower() if match else derive_hash(magnet)
+
+
+async def rd_availability(request: web.Request) -> web.Response:
+    # About half of the hashes are cached
+    hashes = [h.lower() for h in request.match_info["hashes"].split("/") if h]
+    return web.json_response({
+        h: {"rd": [{"1": {"filename": f"{h[:8]}.mp4", "filesize": 1610612736}}]} if int(h[0], 16) % 2 else []
+        for h in hashes
+    })
+
+
+async def rd_torrents(request: web.Request) -> web.Response:
+    library: List[dict] = list(request.app["libraries"].get(_token(request), {}).values())
+    page = int(request.query.get("page", 1))
+    limit = int(request.query.get("limit", 100))
+    torrents = library[(page - 1) * limit:page * limit]
+    if not torrents:
+        return web.Response(status=204)
+    return web.json_response(torrents)
+
+
+async def rd_add_magnet(request: web.Request) -> web.Response:
+    form = await request.post()
+    infohash = _magnet_hash(form.get("magnet", ""))
+    torrent_id = derive_hash(_token(request), infohash)[:13].upper()
+    request.app["libraries"].setdefault(_token(request), {})[torrent_id] = {
+        "id": torrent_id,
+        "filename": f"{infohash[:8]}.mp4",
+        "hash": infohash,
+        "bytes": 1610612736,
+        "status": "downloaded",
+        "links": [f"https://real-debrid.com/d/{torrent_id}"],
+    }
+    return web.json_response({"id": torrent_id, "uri": f"{request.url.origin()}/rest/1.0/torrents/info/{torrent_id}"}, status=201)
+
+
+async def rd_select_files(request: web.Request) -> web.Response:
+    return web.Response(status=204)
+
+
+async def rd_torrent_info(request: web.Request) -> web.Response:
+    torrent = request.app["libraries"].get(_token(request), {}).get(request.match_info["torrent_id"])
+    if torrent is None:
+        return web.json_response({"error": "unknown_ressource", "error_code": 7}, status=404)
+    return web.json_response(torrent)
+
+
+async def rd_unrestrict(request: web.Request) -> web.Response:
+    form = await request.post()
+    link_id = form.get("link", "").rsplit("/", 1)[-1]
+    return web.json_response({
+        "id": link_id,
+        "filename": f"{link_id}.mp4",
+        "download": f"{request.url.origin()}/d/{link_id}/{link_id}.mp4",
+        "streamable": 1,
+    })
+
+
+# --- TorBox ---
+
+async def tb_create(request: web.Request) -> web.Response:
+    form = await request.post()
+    infohash = _magnet_hash(form.get("magnet", ""))
+    torrent_id = int(infohash[:7], 16)
+    request.app["libraries"].setdefault(_token(request), {})[torrent_id] = {
+        "id": torrent_id,
+        "hash": infohash,
+        "name": f"{infohash[:8]}",
+        "download_finished": True,
+        "files": [{"id": 0, "name": f"{infohash[:8]}.mp4", "size": 1610612736}],
+    }
+    return web.json_response({"success": True, "detail": "Found Cached Torrent.", "data": {"torrent_id": torrent_id, "hash": infohash}})
+
+
+async def tb_mylist(request: web.Request) -> web.Response:
+    library = request.app["libraries"].get(_token(request), {})
+    if "id" in request.query:
+        torrent = library.get(int(request.query["id"]))
+        if torrent is None:
+            return web.json_response({"success": False, "error": "NOT_FOUND", "data": None}, status=404)
+        return web.json_response({"success": True, "data": torrent})
+    offset = int(request.query.get("offset", 0))
+    limit = int(request.query.get("limit", 1000))
+    return web.json_response({"success": True, "data": list(library.values())[offset:offset + limit]})
+
+
+async def tb_requestdl(request: web.Request) -> web.Response:
+    torrent_id, file_id = request.query.get("torrent_id"), request.query.get("file_id")
+    return web.json_response({"success": True, "data": f"{request.url.origin()}/dl/{torrent_id}/{file_id}.mp4"})
+
+
+async def tb_search(request: web.Request) -> web.Response:
+    return web.json_response({"success": True, "data": []})
+
+
+# --- Easynews ---
+
+async def easynews_search(request: web.Request) -> web.Response:
+    body = personalize(fixture("easynews_search.json"), request.query.get("gps", ""), escape=lambda s: json.dumps(s)[1:-1])
+    return web.Response(text=body, content_type="application/json")
+
+
+def create_stub(name: str, fault: Fault) -> web.Application:
+    app = web.Application(middlewares=[fault_middleware(fault)])
+    app["libraries"] = {}
+    if name == "stashdb":
+        app.router.add_post("/graphql", stashdb_graphql)
+    elif name == "tpb":
+        app.router.add_get("/search/{query}/{page}/{sort}/{category}", tpb_search)
+    elif name == "x1337":
+        app.router.add_get("/category-search/{query}/XXX/{page}/", x1337_search)
+        app.router.add_get("/torrent/{torrent_id}/{slug}/", x1337_detail)
+    elif name == "torrentgalaxy":
+        app.router.add_get("/torrents.php", torrentgalaxy_search)
+    elif name == "realdebrid":
+        app.router.add_get("/rest/1.0/torrents/instantAvailability/{hashes:.*}", rd_availability)
+        app.router.add_get("/rest/1.0/torrents", rd_torrents)
+        app.router.add_post("/rest/1.0/torrents/addMagnet", rd_add_magnet)
+        app.router.add_post("/rest/1.0/torrents/selectFiles/{torrent_id}", rd_select_files)
+        app.router.add_get("/rest/1.0/torrents/info/{torrent_id}", rd_torrent_info)
+        app.router.add_post("/rest/1.0/unrestrict/link", rd_unrestrict)
+    elif name == "torbox":
+        app.router.add_post("/v1/api/torrents/create", tb_create)
+        app.router.add_get("/v1/api/torrents/mylist", tb_mylist)
+        app.router.add_get("/v1/api/torrents/requestdl", tb_requestdl)
+        app.router.add_get("/v1/api/torrents/search", tb_search)
+    elif name == "easynews":
+        app.router.add_get("/2.0/search/solr-search/advanced", easynews_search)
+    return app
+
+
+async def start_stubs(host: str, port: int, faults: Dict[str, Fault]) -> List[web.AppRunner]:
+    """
+    Start every stub on `port` and up. Returns the runners (call .cleanup() to stop).
+    """
+    runners = []
+    for name, (offset, _, _) in UPSTREAMS.items():
+        runner = web.AppRunner(create_stub(name, faults[name]), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port + offset).start()
+        runners.append(runner)
+    return runners
+
+
+def parse_faults(args: argparse.Namespace) -> Dict[str, Fault]:
+    """
+    Default fault for every upstream, overridden by --upstream NAME:LATENCY[:FAILURE_RATE].
+    """
+    faults = {name: Fault(args.latency, args.jitter, args.failure_rate) for name in UPSTREAMS}
+    for override in args.upstream:
+        name, latency, *rate = override.split(":")
+        if name not in UPSTREAMS:
+            raise SystemExit(f"Unknown upstream '{name}' (one of {', '.join(UPSTREAMS)})")
+        faults[name] = Fault(float(latency), args.jitter, float(rate[0]) if rate else args.failure_rate)
+    return faults
+
+
+def add_fault_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency", type=float, default=0.05, help="Base latency of every upstream (seconds)")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Extra uniform random latency (seconds)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of upstream requests answered with a 503")
+    parser.add_argument(
+        "--upstream", action="append", default=[], metavar="NAME:LATENCY[:FAILURE_RATE]",
+        help=f"Per-upstream override, repeatable ({', '.join(UPSTREAMS)})"
+    )
+
+
+async def serve(host: str, port: int, faults: Dict[str, Fault]):
+    runners = await start_stubs(host, port, faults)
+    try:
+        for variable, url in stub_settings(host, port).items():
+            print(f"{variable}={url}", flush=True)
+        await asyncio.Event().wait()
+    finally:
+        for runner in runners:
+            await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve stub upstreams for benchmarking Creamio")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100, help=f"First port ({len(UPSTREAMS)} consecutive ports are used)")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, parse_faults(args)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,23 @@
+import asyncio
 import base64
 import json
 import logging
 from urllib.parse import quote, unquote
 
 from fastapi import APIRouter, Request, BackgroundTasks
-from fastapi.responses import RedirectResponse, JSONResponse
+from fastapi.responses import RedirectResponse, JSONResponse, Response
 from fastapi.templating import Jinja2Templates
 
+from creamio.core.metrics import CONTENT_TYPE_LATEST, render_metrics
 from creamio.core.settings import get_settings
-from creamio.services.stashdb import StashDBClient
-from creamio.services.scrapers.manager import ScraperManager
+from creamio.core.timing import current_timings, stage, timed
+from creamio.services.catalog import CATALOG_ID, get_catalog_scenes
+from creamio.services.search import build_search_query, lookup_scene, search_torrents
+from creamio.services.resolve import resolve_link
+from creamio.services.prefetch import prefetch_scenes
 from creamio.services.debrid.realdebrid import RealDebrid
 from creamio.services.debrid.torbox import TorBox
 from creamio.services.debrid.easynews import EasynewsClient
-from creamio.db.database import get_cached_search, cache_search_results
 
 router = APIRouter()
 settings = get_settings()
@@ -34,6 +38,13 @@ def parse_config(b64_config: str) -> dict:
 async def root():
     return RedirectResponse("/configure")
 
+@router.get("/metrics")
+async def metrics():
+    """
+    Prometheus metrics (request/upstream latency, cache hit ratios, in-flight scrapes).
+    """
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
 @router.get("/configure")
 async def configure(request: Request):
     return templates.TemplateResponse("config.html", {"request": request})
@@ -61,64 +72,57 @@ async def manifest(config: str = None):
 
 @router.get("/{config}/catalog/{type}/{id}.json")
 @router.get("/{config}/catalog/{type}/{id}/{extra}.json")
-async def catalog(config: str, type: str, id: str, extra: str = None):
+async def catalog(background_tasks: BackgroundTasks, config: str, type: str, id: str, extra: str = None):
     """
     Handles both 'Trending' (no extra) and 'Search' (extra=search=...)
     """
     logger.info(f"[Catalog] Request: type={type}, id={id}, extra={extra}")
     
-    if id != "stashdb_search":
+    if id != CATALOG_ID:
         return {"metas": []}
 
-    client = StashDBClient()
-    scenes = []
     search_query = ""
 
     # Robust 'extra' parsing
-    if extra:
-        try:
-            # Stremio often sends extra as: "search=term"
-            # or "genre=something&search=term"
-            params = extra.split("&")
-            for param in params:
-                if param.startswith("search="):
-                    raw_query = param.split("search=")[1]
-                    search_query = unquote(raw_query)
-                    break
-        except Exception as e:
-            logger.error(f"[Catalog] Failed to parse extra args: {e}")
+    with stage("config"):
+        if extra:
+            try:
+                # Stremio often sends extra as: "search=term"
+                # or "genre=something&search=term"
+                params = extra.split("&")
+                for param in params:
+                    if param.startswith("search="):
+                        raw_query = param.split("search=")[1]
+                        search_query = unquote(raw_query)
+                        break
+            except Exception as e:
+                logger.error(f"[Catalog] Failed to parse extra args: {e}")
 
-    if search_query:
-        logger.info(f"[Catalog] Searching StashDB for: '{search_query}'")
-        
-        # 1. Try to find Performer first (High priority for "Mia Malkova")
-        performer_scenes = await client.get_performer_scenes(search_query)
-        
-        if performer_scenes:
-            logger.info(f"[Catalog] Found {len(performer_scenes)} scenes via Performer lookup")
-            scenes = performer_scenes
-        else:
-            # 2. Fallback to scene title search
-            logger.info(f"[Catalog] Performer lookup empty. Searching scene titles...")
-            scenes = await client.search_scenes(search_query)
-    else:
-        # No search query = Trending
-        logger.info("[Catalog] Fetching Trending Scenes")
-        scenes = await client.search_scenes("", page=1)
+    # No search query = Trending (kept warm by a background refresher)
+    scenes = await get_catalog_scenes(id, search_query, background_tasks=background_tasks)
     
     logger.info(f"[Catalog] Returning {len(scenes)} items")
 
-    metas = []
-    for s in scenes:
-        img = s["images"][0]["url"] if s.get("images") else None
-        metas.append({
-            "id": f"stashdb:{s['id']}",
-            "type": "movie",
-            "name": s.get("title", "Unknown"),
-            "poster": img,
-            "description": s.get("details")
-        })
-    return {"metas": metas}
+    with stage("assemble"):
+        metas = []
+        for s in scenes:
+            img = s["images"][0]["url"] if s.get("images") else None
+            metas.append({
+                "id": f"stashdb:{s['id']}",
+                "type": "movie",
+                "name": s.get("title", "Unknown"),
+                "poster": img,
+                "description": s.get("details")
+            })
+
+    # Users almost always open one of the first few scenes; warm them after responding
+    if settings.PREFETCH_ENABLED and scenes:
+        background_tasks.add_task(prefetch_scenes, [s["id"] for s in scenes])
+
+    body = {"metas": metas}
+    if settings.DEBUG_TIMINGS:
+        body["_timings"] = current_timings()
+    return body
 
 # ... Meta and Stream endpoints remain the same (they were correct) ...
 # (Include the rest of the file as previously provided)
@@ -126,8 +130,7 @@ async def catalog(config: str, type: str, id: str, extra: str = None):
 async def meta(config: str, type: str, id: str):
     logger.info(f"[Meta] Request for {id}")
     real_id = id.replace("stashdb:", "")
-    client = StashDBClient()
-    scene = await client.get_scene(real_id)
+    scene = await lookup_scene(real_id)
     
     if not scene: 
         logger.warning(f"[Meta] Scene not found in StashDB: {real_id}")
@@ -146,109 +149,147 @@ async def meta(config: str, type: str, id: str):
     }}
 
 @router.get("/{config}/stream/{type}/{id}.json")
-async def stream(request: Request, config: str, type: str, id: str):
+async def stream(request: Request, background_tasks: BackgroundTasks, config: str, type: str, id: str):
     logger.info(f"[Stream] Request for {id}")
-    conf = parse_config(config)
+    # Latency budget for the whole request: every leg below gets what is left of it
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.STREAM_DEADLINE
+    with stage("config"):
+        conf = parse_config(config)
     real_id = id.replace("stashdb:", "")
     
-    client = StashDBClient()
-    scene = await client.get_scene(real_id)
+    try:
+        scene = await asyncio.wait_for(lookup_scene(real_id), max(deadline - loop.time(), 0))
+    except asyncio.TimeoutError:
+        logger.error(f"[Stream] Scene lookup timed out for {real_id}")
+        return {"streams": []}
     if not scene: 
         logger.error(f"[Stream] Scene metadata lookup failed for {real_id}")
         return {"streams": []}
     
     # Build Query
-    query = scene['title']
-    if len(query) < 10 and scene.get("performers"):
-        query += " " + " ".join([p["name"] for p in scene["performers"]])
+    query = build_search_query(scene)
     
     logger.info(f"[Stream] Generated Search Query: '{query}'")
     
-    streams = []
     base_url = str(request.base_url).rstrip("/")
 
-    # --- Easynews ---
+    # Every provider runs concurrently with its own timeout, so the endpoint
+    # costs max(provider) instead of sum(provider). A slow or failing
+    # provider only drops its own streams.
+    remaining = deadline - loop.time()
+    providers = []
     if conf.get("easynews_user") and conf.get("easynews_pass"):
-        try:
-            logger.info("[Stream] Searching Easynews...")
-            en = EasynewsClient(conf["easynews_user"], conf["easynews_pass"])
-            en_results = await en.search(query)
-            logger.info(f"[Stream] Easynews found {len(en_results)} results")
-            for res in en_results:
-                streams.append({
-                    "name": "[EN] Easynews",
-                    "title": f"{res.title}\nDirect Stream",
-                    "url": res.magnet
-                })
-        except Exception as e:
-            logger.error(f"[Stream] Easynews Error: {e}")
-
-    # --- Scrapers ---
+        en_timeout = min(settings.EASYNEWS_TIMEOUT, max(remaining, 0))
+        providers.append(run_provider("Easynews", timed("easynews", easynews_streams(conf, query)), en_timeout))
     if conf.get("rd_key") or conf.get("torbox_key"):
-        logger.info("[Stream] Checking Cache for torrents...")
-        scraper_mgr = ScraperManager()
-        cached = await get_cached_search(query)
-        
-        if cached:
-            logger.info(f"[Stream] Cache Hit: {len(cached)} torrents found")
-            torrents = cached
-        else:
-            logger.info("[Stream] Cache Miss: Starting Scrapers...")
-            scrape_results = await scraper_mgr.search(query)
-            torrents = [r.model_dump() for r in scrape_results]
-            await cache_search_results(query, torrents)
-            logger.info(f"[Stream] Scraped {len(torrents)} new torrents")
-        
-        # --- Real Debrid ---
-        if conf.get("rd_key"):
-            try:
-                logger.info("[Stream] Checking RealDebrid Availability...")
-                rd = RealDebrid(conf["rd_key"])
-                hashes = [t["infohash"] for t in torrents if t["source"] != "Easynews"]
-                availability = await rd.check_availability(hashes)
-                
-                rd_count = 0
-                for t in torrents:
-                    if t["source"] == "Easynews": continue
-                    h = t["infohash"]
-                    is_cached = availability.get(h, False)
-                    
-                    title = f"{'[RD+]' if is_cached else '[RD]'} {t['title']}\n💾 {t['size']/1024/1024:.0f}MB 👤 {t['seeders']}"
-                    b64_magnet = base64.urlsafe_b64encode(t["magnet"].encode()).decode()
-                    
-                    streams.append({
-                        "name": f"RD {t['source']}",
-                        "title": title,
-                        "url": f"{base_url}/resolve/rd/{conf['rd_key']}/{h}/{b64_magnet}"
-                    })
-                    rd_count += 1
-                logger.info(f"[Stream] Added {rd_count} RD streams")
-            except Exception as e:
-                logger.error(f"[Stream] RD Error: {e}")
+        providers.append(run_provider("Torrents", torrent_streams(conf, query, base_url, background_tasks, deadline)))
 
-        # --- TorBox ---
-        if conf.get("torbox_key"):
-            try:
-                logger.info("[Stream] Processing TorBox results...")
-                # TB Logic...
-                tb_count = 0
-                for t in torrents:
-                    if t["source"] == "Easynews": continue
-                    h = t["infohash"]
-                    title = f"[TB] {t['title']}\n💾 {t['size']/1024/1024:.0f}MB 👤 {t['seeders']}"
-                    b64_magnet = base64.urlsafe_b64encode(t["magnet"].encode()).decode()
-                    streams.append({
-                        "name": f"TB {t['source']}",
-                        "title": title,
-                        "url": f"{base_url}/resolve/tb/{conf['torbox_key']}/{h}/{b64_magnet}"
-                    })
-                    tb_count += 1
-                logger.info(f"[Stream] Added {tb_count} TorBox streams")
-            except Exception as e:
-                 logger.error(f"[Stream] TorBox Error: {e}")
+    provider_results = await asyncio.gather(*providers)
+
+    with stage("assemble"):
+        streams = []
+        for provider_streams in provider_results:
+            streams.extend(provider_streams)
             
     logger.info(f"[Stream] Total streams returned: {len(streams)}")
-    return {"streams": streams}
+    body = {"streams": streams}
+    if settings.DEBUG_TIMINGS:
+        body["_timings"] = current_timings()
+    return body
+
+async def run_provider(name: str, coro, timeout: float | None = None) -> list:
+    """
+    Await a stream provider, turning timeouts and errors into an empty list.
+    """
+    try:
+        return await asyncio.wait_for(coro, timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"[Stream] {name} timed out after {timeout}s")
+    except Exception as e:
+        logger.error(f"[Stream] {name} Error: {e}")
+    return []
+
+async def easynews_streams(conf: dict, query: str) -> list:
+    logger.info("[Stream] Searching Easynews...")
+    en = EasynewsClient(conf["easynews_user"], conf["easynews_pass"])
+    en_results = await en.search(query)
+    logger.info(f"[Stream] Easynews found {len(en_results)} results")
+    return [
+        {
+            "name": "[EN] Easynews",
+            "title": f"{res.title}\nDirect Stream",
+            "url": res.magnet
+        }
+        for res in en_results
+    ]
+
+async def torrent_streams(conf: dict, query: str, base_url: str, background_tasks: BackgroundTasks, deadline: float) -> list:
+    """
+    Scraper pipeline: cached/scraped torrents, then the debrid providers concurrently.
+    When the deadline passes mid-scrape we continue with the partial results.
+    """
+    loop = asyncio.get_running_loop()
+    # Keep a slice of the budget for the RD availability check after the scrape
+    reserve = settings.DEBRID_RESERVE if conf.get("rd_key") else 0
+    logger.info("[Stream] Checking Cache for torrents...")
+    with stage("search"):
+        torrents = await search_torrents(query, background_tasks, timeout=deadline - reserve - loop.time())
+
+    # The upstream availability check gets what is left of the budget, at most
+    # DEBRID_TIMEOUT (cached availability is used even when nothing is left)
+    debrid_timeout = min(settings.DEBRID_TIMEOUT, max(deadline - loop.time(), 0))
+    debrids = []
+    if conf.get("rd_key"):
+        debrids.append(run_provider("RD", rd_streams(conf, torrents, base_url, debrid_timeout)))
+    if conf.get("torbox_key"):
+        debrids.append(run_provider("TorBox", tb_streams(conf, torrents, base_url)))
+
+    streams = []
+    for debrid_streams in await asyncio.gather(*debrids):
+        streams.extend(debrid_streams)
+    return streams
+
+async def rd_streams(conf: dict, torrents: list, base_url: str, timeout: float) -> list:
+    logger.info("[Stream] Checking RealDebrid Availability...")
+    rd = RealDebrid(conf["rd_key"])
+    hashes = [t["infohash"] for t in torrents if t["source"] != "Easynews"]
+    with stage("rd-availability"):
+        # Out of budget, only the locally cached answers get the [RD+] mark
+        availability = await rd.check_availability(hashes, timeout=timeout)
+    
+    streams = []
+    for t in torrents:
+        if t["source"] == "Easynews": continue
+        h = t["infohash"]
+        is_cached = availability.get(h, False)
+        
+        title = f"{'[RD+]' if is_cached else '[RD]'} {t['title']}\n💾 {t['size']/1024/1024:.0f}MB 👤 {t['seeders']}"
+        b64_magnet = base64.urlsafe_b64encode(t["magnet"].encode()).decode()
+        
+        streams.append({
+            "name": f"RD {t['source']}",
+            "title": title,
+            "url": f"{base_url}/resolve/rd/{conf['rd_key']}/{h}/{b64_magnet}"
+        })
+    logger.info(f"[Stream] Added {len(streams)} RD streams")
+    return streams
+
+async def tb_streams(conf: dict, torrents: list, base_url: str) -> list:
+    logger.info("[Stream] Processing TorBox results...")
+    streams = []
+    for t in torrents:
+        if t["source"] == "Easynews": continue
+        h = t["infohash"]
+        title = f"[TB] {t['title']}\n💾 {t['size']/1024/1024:.0f}MB 👤 {t['seeders']}"
+        b64_magnet = base64.urlsafe_b64encode(t["magnet"].encode()).decode()
+        streams.append({
+            "name": f"TB {t['source']}",
+            "title": title,
+            "url": f"{base_url}/resolve/tb/{conf['torbox_key']}/{h}/{b64_magnet}"
+        })
+    logger.info(f"[Stream] Added {len(streams)} TorBox streams")
+    return streams
 
 @router.get("/resolve/rd/{token}/{infohash}/{b64_magnet}")
 async def resolve_rd(token: str, infohash: str, b64_magnet: str):
@@ -256,7 +297,10 @@ async def resolve_rd(token: str, infohash: str, b64_magnet: str):
     try:
         magnet = base64.urlsafe_b64decode(b64_magnet).decode()
         rd = RealDebrid(token)
-        link = await rd.resolve_stream(magnet, infohash)
+        link = await resolve_link(
+            RealDebrid.PROVIDER, token, infohash, settings.RD_LINK_TTL,
+            lambda: rd.resolve_stream(magnet, infohash)
+        )
         if link: 
             logger.info("[Resolve] Success -> Redirecting")
             return RedirectResponse(link)
@@ -271,7 +315,10 @@ async def resolve_tb(token: str, infohash: str, b64_magnet: str):
     try:
         magnet = base64.urlsafe_b64decode(b64_magnet).decode()
         tb = TorBox(token)
-        link = await tb.resolve_stream(magnet, infohash)
+        link = await resolve_link(
+            TorBox.PROVIDER, token, infohash, settings.TB_LINK_TTL,
+            lambda: tb.resolve_stream(magnet, infohash)
+        )
         if link: 
             logger.info("[Resolve] Success -> Redirecting")
             return RedirectResponse(link)
@@ -0,0 +1,96 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from creamio.core.metrics import MEMORY_CACHE_BYTES, MEMORY_CACHE_ENTRIES, MEMORY_CACHE_LOOKUPS
+
+
+class TTLCache:
+    """
+    Small bounded in-memory LRU cache with per-entry expiry.
+
+    Bounded by entry count and, optionally, by an approximate total size in
+    bytes (as reported by the caller on set). Hits, misses, entries and bytes
+    are exported on /metrics under the cache's name.
+
+    Not thread-safe; it is meant to be used from the asyncio event loop only.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float, max_bytes: int = 0):
+        """
+        Args:
+            name: Label of the cache in the metrics (e.g. "scene")
+            maxsize: Max number of entries kept before evicting the least recently used
+            ttl: Default time-to-live of an entry (in seconds)
+            max_bytes: Max total approximate size of the entries (0 = unbounded)
+        """
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._hits = MEMORY_CACHE_LOOKUPS.labels(name, "hit")
+        self._misses = MEMORY_CACHE_LOOKUPS.labels(name, "miss")
+        self._entries_gauge = MEMORY_CACHE_ENTRIES.labels(name)
+        self._bytes_gauge = MEMORY_CACHE_BYTES.labels(name)
+        self._data: "OrderedDict[Hashable, tuple[float, Any, int]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Return the cached value, or None if missing/expired.
+        """
+        item = self._data.get(key)
+        if item is None:
+            self._misses.inc()
+            return None
+
+        expires_at, value, _ = item
+        if expires_at <= time.monotonic():
+            self.pop(key)
+            self._misses.inc()
+            return None
+
+        # Mark as most recently used
+        self._data.move_to_end(key)
+        self._hits.inc()
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, size: int = 0):
+        """
+        Store a value, evicting the least recently used entries if full.
+
+        Args:
+            size: Approximate size of the value in bytes, counted against max_bytes
+        """
+        if self.maxsize <= 0 or (self.max_bytes and size > self.max_bytes):
+            # Would evict everything else and still not fit
+            self.pop(key)
+            return
+
+        self.pop(key)
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value, size)
+        self.bytes += size
+
+        while len(self._data) > self.maxsize or (self.max_bytes and self.bytes > self.max_bytes):
+            _, (_, _, evicted_size) = self._data.popitem(last=False)
+            self.bytes -= evicted_size
+        self._update_gauges()
+
+    def pop(self, key: Hashable):
+        item = self._data.pop(key, None)
+        if item is not None:
+            self.bytes -= item[2]
+            self._update_gauges()
+
+    def clear(self):
+        self._data.clear()
+        self.bytes = 0
+        self._update_gauges()
+
+    def _update_gauges(self):
+        self._entries_gauge.set(len(self._data))
+        self._bytes_gauge.set(self.bytes)
+
+    def __len__(self) -> int:
+        return len(self._data)
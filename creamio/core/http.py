@@ -0,0 +1,76 @@
+import logging
+
+import aiohttp
+import orjson
+
+from creamio.core.metrics import upstream_trace_config
+from creamio.core.settings import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# The process-wide pooled HTTP session.
+# Created once in the app lifespan and shared by every upstream client
+# (scrapers, StashDB, RealDebrid, TorBox, Easynews) so that warm requests
+# reuse keep-alive connections instead of paying DNS + TCP + TLS each time.
+_session: aiohttp.ClientSession | None = None
+
+
+def _json_serialize(obj) -> str:
+    # orjson returns bytes, aiohttp expects a str
+    return orjson.dumps(obj).decode("utf-8")
+
+
+def _create_session() -> aiohttp.ClientSession:
+    connector = aiohttp.TCPConnector(
+        limit=settings.HTTP_POOL_SIZE,
+        limit_per_host=settings.HTTP_POOL_PER_HOST,
+        ttl_dns_cache=settings.HTTP_DNS_CACHE_TTL,
+        keepalive_timeout=settings.HTTP_KEEPALIVE_TIMEOUT,
+        enable_cleanup_closed=True,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=settings.HTTP_TIMEOUT),
+        json_serialize=_json_serialize,
+        # Per-upstream latency/outcome metrics
+        trace_configs=[upstream_trace_config()],
+    )
+
+
+async def init_http_client():
+    """
+    Create the shared HTTP session.
+    This is called when the addon starts.
+    """
+    global _session
+    if _session is None or _session.closed:
+        _session = _create_session()
+        logger.info(
+            f"HTTP pool ready (limit={settings.HTTP_POOL_SIZE}, "
+            f"per_host={settings.HTTP_POOL_PER_HOST})"
+        )
+
+
+async def close_http_client():
+    """
+    Close the shared HTTP session and its pooled connections.
+    Called when the addon shuts down.
+    """
+    global _session
+    if _session is not None:
+        await _session.close()
+        _session = None
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """
+    Return the shared HTTP session.
+
+    Falls back to creating it lazily so that scripts running outside the
+    FastAPI lifespan still work. Must be called from inside a running loop.
+    """
+    global _session
+    if _session is None or _session.closed:
+        _session = _create_session()
+    return _session
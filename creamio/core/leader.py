@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, List
+
+from creamio.core.settings import get_settings
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; there every process leads
+    fcntl = None
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Held open for as long as this process is the leader. The kernel drops the
+# lock when the process exits, so a recycled or crashed leader frees it.
+_lock_fd: int | None = None
+
+
+def try_acquire_leadership() -> bool:
+    """
+    Try to become the one worker (per host) that runs background jobs,
+    via a non-blocking flock on LEADER_LOCK_FILE.
+    """
+    global _lock_fd
+    if _lock_fd is not None or fcntl is None:
+        return True
+
+    fd = os.open(settings.LEADER_LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return False
+
+    _lock_fd = fd
+    return True
+
+
+def release_leadership():
+    global _lock_fd
+    if _lock_fd is not None:
+        os.close(_lock_fd)
+        _lock_fd = None
+
+
+async def run_as_leader(jobs: List[Callable[[], Awaitable[None]]]):
+    """
+    Run the background jobs in this process only while it holds leadership.
+
+    Workers that lose the election retry every LEADER_RETRY_INTERVAL seconds,
+    so the jobs move to another worker when the leader is recycled.
+    Runs until cancelled (app shutdown), then releases the lock.
+    """
+    try:
+        while not try_acquire_leadership():
+            await asyncio.sleep(settings.LEADER_RETRY_INTERVAL)
+
+        logger.info(f"[Leader] Worker {os.getpid()} runs the background jobs")
+        await asyncio.gather(*(_supervise(job) for job in jobs))
+    finally:
+        release_leadership()
+
+
+async def _supervise(job: Callable[[], Awaitable[None]]):
+    """
+    Run a job, restarting it LEADER_RETRY_INTERVAL seconds after it crashes.
+
+    A crashed job must not end the others: the lock would be released while
+    they keep running here, and a second leader would start them again.
+    """
+    while True:
+        try:
+            return await job()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception(f"[Leader] Background job {job.__name__} crashed, restarting")
+        await asyncio.sleep(settings.LEADER_RETRY_INTERVAL)
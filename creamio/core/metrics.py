@@ -0,0 +1,161 @@
+import os
+import time
+from typing import Dict, Tuple
+from urllib.parse import urlsplit
+
+import aiohttp
+from fastapi import Request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+)
+
+# Prometheus metrics, exposed on /metrics.
+#
+# Under gunicorn every worker has its own counters; they are aggregated across
+# workers on scrape through PROMETHEUS_MULTIPROC_DIR (set by gunicorn.conf.py).
+
+# Stremio clients give up after a few seconds, so resolution is finest there
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0)
+
+REQUEST_LATENCY = Histogram(
+    "creamio_request_duration_seconds",
+    "Latency of addon requests per route",
+    ["route"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS = Counter(
+    "creamio_requests_total",
+    "Addon requests per route and status code",
+    ["route", "status"],
+)
+
+UPSTREAM_LATENCY = Histogram(
+    "creamio_upstream_duration_seconds",
+    "Latency of requests to upstream services (torrent sites, StashDB, debrid APIs)",
+    ["upstream"],
+    buckets=LATENCY_BUCKETS,
+)
+UPSTREAM_REQUESTS = Counter(
+    "creamio_upstream_requests_total",
+    "Requests to upstream services by outcome (ok, http_error, error)",
+    ["upstream", "outcome"],
+)
+
+CACHE_LOOKUPS = Counter(
+    "creamio_cache_lookups_total",
+    "Cache lookups by result (hit, stale, miss)",
+    ["cache", "result"],
+)
+
+# In-memory tiers (core/cache.py TTLCache), per worker; summed across workers
+MEMORY_CACHE_LOOKUPS = Counter(
+    "creamio_memory_cache_lookups_total",
+    "In-memory cache lookups by result (hit, miss)",
+    ["cache", "result"],
+)
+MEMORY_CACHE_ENTRIES = Gauge(
+    "creamio_memory_cache_entries",
+    "Entries held by an in-memory cache",
+    ["cache"],
+    multiprocess_mode="livesum",
+)
+MEMORY_CACHE_BYTES = Gauge(
+    "creamio_memory_cache_bytes",
+    "Approximate size of an in-memory cache's entries (caches that track it)",
+    ["cache"],
+    multiprocess_mode="livesum",
+)
+
+SCRAPES_IN_FLIGHT = Gauge(
+    "creamio_scrapes_in_flight",
+    "Distinct search queries currently being scraped",
+    multiprocess_mode="livesum",
+)
+
+# Upstream (host, port) -> label (e.g. ("api.real-debrid.com", 443) -> "RealDebrid").
+# Requests to unregistered hosts are not recorded, so labels stay bounded.
+# The port is part of the key so stubs sharing one host stay apart (benchmarks/).
+_upstream_hosts: Dict[Tuple[str, int], str] = {}
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def register_upstream(url: str, name: str):
+    """
+    Label every request to the host (and port) of `url` as upstream `name`.
+    """
+    parts = urlsplit(url)
+    if parts.hostname:
+        port = parts.port or _DEFAULT_PORTS.get(parts.scheme, 0)
+        _upstream_hosts[(parts.hostname, port)] = name
+
+
+async def _on_request_start(session, ctx, params: aiohttp.TraceRequestStartParams):
+    ctx.started = time.perf_counter()
+
+
+async def _on_request_end(session, ctx, params: aiohttp.TraceRequestEndParams):
+    outcome = "ok" if params.response.status < 400 else "http_error"
+    _observe_upstream(ctx, params.url, outcome)
+
+
+async def _on_request_exception(session, ctx, params: aiohttp.TraceRequestExceptionParams):
+    _observe_upstream(ctx, params.url, "error")
+
+
+def _observe_upstream(ctx, url, outcome: str):
+    upstream = _upstream_hosts.get((url.host, url.port))
+    if upstream is None or not hasattr(ctx, "started"):
+        return
+    UPSTREAM_LATENCY.labels(upstream).observe(time.perf_counter() - ctx.started)
+    UPSTREAM_REQUESTS.labels(upstream, outcome).inc()
+
+
+def upstream_trace_config() -> aiohttp.TraceConfig:
+    """
+    aiohttp hooks timing every request made through the shared session.
+    """
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(_on_request_start)
+    trace_config.on_request_end.append(_on_request_end)
+    trace_config.on_request_exception.append(_on_request_exception)
+    return trace_config
+
+
+async def track_requests(request: Request, call_next):
+    """
+    HTTP middleware recording latency and status per route (endpoint name).
+    """
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        endpoint = request.scope.get("endpoint")
+        # Unmatched paths (404s, static files) are left out to bound the label set
+        if endpoint is not None and endpoint.__name__ != "metrics":
+            route = endpoint.__name__
+            REQUEST_LATENCY.labels(route).observe(time.perf_counter() - started)
+            REQUESTS.labels(route, str(status)).inc()
+
+
+def render_metrics() -> bytes:
+    """
+    Current metrics in the Prometheus text format, aggregated across
+    workers when PROMETHEUS_MULTIPROC_DIR is set.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
@@ -20,6 +20,19 @@ class Settings(BaseSettings):
     
     # Logging level (DEBUG, INFO, WARNING, ERROR)
     LOG_LEVEL: str = "INFO"
+
+    # Development mode: `python main.py` auto-reloads on code changes
+    DEBUG: bool = False
+
+    # Add a "_timings" block (per-stage durations, like the Server-Timing
+    # header) to /stream and /catalog responses. For debugging only.
+    DEBUG_TIMINGS: bool = False
+
+    # Background jobs (trending refresh, cache janitor) run in a single worker
+    # per host: the one holding an flock on this file. The others retry every
+    # LEADER_RETRY_INTERVAL seconds in case the leader is recycled.
+    LEADER_LOCK_FILE: str = "data/creamio.leader.lock"
+    LEADER_RETRY_INTERVAL: float = 30.0
     
     # --- StashDB Configuration ---
     # The GraphQL endpoint for StashDB (Defaults to the public instance)
@@ -29,15 +42,105 @@ class Settings(BaseSettings):
     # If provided here, it can be used as a fallback if the user doesn't provide one.
     STASHDB_API_KEY: str | None = None
 
+    # Max scenes fetched per batched (aliased) GraphQL request
+    STASHDB_BATCH_SIZE: int = 25
+
+    # Max number of performer name -> id lookups kept in memory, and for how
+    # long (in seconds). Default: 7 days, a name rarely changes performer.
+    STASHDB_PERFORMER_CACHE_SIZE: int = 1024
+    STASHDB_PERFORMER_CACHE_TTL: int = 604800
+
     # --- Database & Caching ---
     # Location of the SQLite database for caching torrent results
     # We use a local file by default, stored in a 'data' directory
     DATABASE_URL: str = "sqlite+aiosqlite:///data/creamio.db"
     
+    # Where the search, scene and catalog caches are stored:
+    # "sqlite" (the DATABASE_URL file, per container) or "redis" (REDIS_URL,
+    # shared by every worker and node so they all see one warm cache)
+    CACHE_BACKEND: str = "sqlite"
+    REDIS_URL: str = "redis://localhost:6379/0"
+
+    # Max open connections to Redis per worker
+    REDIS_POOL_SIZE: int = 20
+
     # How long to cache scraper results (in seconds)
     # Default: 24 hours (86400 seconds)
     CACHE_TTL: int = 86400
-    
+
+    # Hard expiry for scraper results (in seconds)
+    # Between CACHE_TTL and this, stale results are served immediately
+    # while a background scrape refreshes them (stale-while-revalidate).
+    # Default: 7 days. Set equal to CACHE_TTL to disable.
+    CACHE_STALE_TTL: int = 604800
+
+    # In-memory tier in front of the search cache: max number of queries and
+    # max approximate size of their JSON (in bytes, default 64 MB)
+    SEARCH_CACHE_SIZE: int = 2048
+    SEARCH_CACHE_MAX_BYTES: int = 67108864
+
+    # How long to cache StashDB scene metadata used by /meta and /stream (in seconds)
+    # Default: 7 days, scene metadata almost never changes
+    SCENE_CACHE_TTL: int = 604800
+
+    # Max number of scenes kept in the in-memory LRU in front of the SQLite table
+    SCENE_CACHE_SIZE: int = 2048
+
+    # Store cached JSON blobs zlib-compressed (smaller file, a bit more CPU).
+    # Can be toggled at any time: old rows stay readable either way.
+    CACHE_COMPRESSION: bool = False
+    CACHE_COMPRESSION_LEVEL: int = 6
+
+    # Expired cache rows are purged every CACHE_JANITOR_INTERVAL seconds,
+    # CACHE_JANITOR_BATCH rows per delete so writers are never blocked for long
+    CACHE_JANITOR_INTERVAL: int = 3600
+    CACHE_JANITOR_BATCH: int = 500
+
+    # How long catalog pages are considered fresh (in seconds).
+    # Trending is the same for everyone and is refreshed in the background every
+    # CATALOG_REFRESH_INTERVAL, so it never expires while the addon runs.
+    # Older entries are still served (up to CACHE_STALE_TTL) while refreshing.
+    CATALOG_TRENDING_TTL: int = 3600
+    CATALOG_SEARCH_TTL: int = 21600
+    CATALOG_REFRESH_INTERVAL: int = 1800
+
+    # Max number of catalog pages kept in memory
+    CATALOG_CACHE_SIZE: int = 512
+
+    # How long debrid availability ("is this hash cached on RD?") is trusted (in seconds).
+    # Shared across all users/tokens since the answer is the same for everyone.
+    AVAILABILITY_CACHE_TTL: int = 1800
+
+    # How long resolved direct download links are reused (in seconds).
+    # Keep these below each provider's link lifetime.
+    RD_LINK_TTL: int = 7200
+    TB_LINK_TTL: int = 7200
+
+    # Max number of resolved links kept in memory
+    LINK_CACHE_SIZE: int = 4096
+
+    # How long a user's debrid library index (torrents already in their account)
+    # is trusted before it is re-synced from the provider (in seconds)
+    RD_LIBRARY_TTL: int = 600
+    TB_LIBRARY_TTL: int = 600
+
+    # RealDebrid /torrents listing: entries per page and max pages per sync
+    RD_LIBRARY_PAGE_SIZE: int = 1000
+    RD_LIBRARY_MAX_PAGES: int = 5
+
+    # TorBox /torrents/mylist listing: entries per page and max pages per sync
+    TB_LIBRARY_PAGE_SIZE: int = 1000
+    TB_LIBRARY_MAX_PAGES: int = 5
+
+    # After a failed library sync (provider down, revoked token), wait this long
+    # before trying again instead of retrying on every resolve (in seconds)
+    LIBRARY_SYNC_RETRY: int = 60
+
+    # Max number of per-user library indexes kept in memory, and how long an
+    # unused one is kept (in seconds)
+    LIBRARY_INDEX_SIZE: int = 512
+    LIBRARY_INDEX_TTL: int = 86400
+
     # --- Scraper Configuration ---
     # User Agent to use when scraping torrent sites to avoid blocking
     USER_AGENT: str = (
@@ -46,10 +149,116 @@ class Settings(BaseSettings):
         "Chrome/142.0.0.0 Safari/537.36"
     )
 
+    # Base URLs of the torrent sites (point them at a mirror if the default is
+    # blocked or down, or at local stubs, see benchmarks/)
+    TPB_URL: str = "https://tpb.party"
+    X1337_URL: str = "https://1337x.to"
+    TORRENTGALAXY_URL: str = "https://torrentgalaxy.to"
+
     # Proxy URL for scraping (Optional)
     # Useful if torrent sites are blocked in your server's region
     SCRAPE_PROXY: str | None = None
 
+    # Scraped results whose title matches the search below this fuzzy score
+    # (0-100, token set ratio) are dropped before ranking. 0 keeps everything.
+    RANK_MIN_SCORE: int = 40
+
+    # Match scores are compared in buckets this wide (points) when ranking, so
+    # seeders and size decide between titles that match about equally well.
+    RANK_SCORE_BUCKET: int = 10
+
+    # Max pages fetched concurrently from a single torrent site (across all searches)
+    SCRAPER_SITE_CONCURRENCY: int = 5
+
+    # Per-site circuit breaker: after this many consecutive failures a site is
+    # skipped instantly for SCRAPER_BREAKER_COOLDOWN seconds, then probed again
+    SCRAPER_BREAKER_THRESHOLD: int = 3
+    SCRAPER_BREAKER_COOLDOWN: float = 60.0
+
+    # Adaptive per-site timeouts (in seconds): p95 of the last
+    # SCRAPER_LATENCY_WINDOW request latencies x SCRAPER_TIMEOUT_MULTIPLIER,
+    # clamped to [SCRAPER_TIMEOUT_MIN, SCRAPER_TIMEOUT_MAX]
+    SCRAPER_TIMEOUT_MIN: float = 3.0
+    SCRAPER_TIMEOUT_MAX: float = 15.0
+    SCRAPER_TIMEOUT_MULTIPLIER: float = 3.0
+    SCRAPER_LATENCY_WINDOW: int = 50
+
+    # Where HTML parsing runs so it doesn't block the event loop:
+    # "thread" (default), "process" (true parallelism, pays pickling) or "inline"
+    PARSER_POOL: str = "thread"
+
+    # Number of parser workers (0 = min(4, CPU count))
+    PARSER_WORKERS: int = 0
+
+    # HTML parser engine for the scrapers: "lxml" (precompiled XPath, faster and
+    # lighter, falls back to BeautifulSoup if the page isn't recognised) or "bs4"
+    SCRAPER_PARSER: str = "lxml"
+
+    # Per-site engine overrides keyed by site name, e.g. {"1337x": "bs4"}
+    # (as JSON in the environment: SCRAPER_PARSER_OVERRIDES='{"1337x": "bs4"}')
+    SCRAPER_PARSER_OVERRIDES: dict[str, str] = {}
+
+    # How many 1337x results get their detail page fetched for the magnet link.
+    # Higher = more results, but more sub-requests per search.
+    X1337_DETAIL_PAGES: int = 5
+
+    # --- Stream Providers ---
+    # API base URLs (Easynews: the search endpoint itself)
+    REALDEBRID_API_URL: str = "https://api.real-debrid.com/rest/1.0"
+    TORBOX_API_URL: str = "https://api.torbox.app/v1/api"
+    EASYNEWS_API_URL: str = "https://members.easynews.com/2.0/search/solr-search/advanced"
+
+    # /stream runs every provider concurrently; each one gets its own timeout
+    # (in seconds) and only its own streams are dropped when it fires.
+    EASYNEWS_TIMEOUT: float = 10.0
+
+    # Max time for the upstream RealDebrid availability check, also capped by
+    # what is left of STREAM_DEADLINE (when it fires, only cached answers are used)
+    DEBRID_TIMEOUT: float = 8.0
+
+    # Part of STREAM_DEADLINE (in seconds) the scrape leaves for that check,
+    # so responses cut off by the deadline can still mark cached torrents
+    DEBRID_RESERVE: float = 1.5
+
+    # Max concurrent RealDebrid instantAvailability batches per request
+    RD_AVAILABILITY_CONCURRENCY: int = 4
+
+    # Latency budget for /stream (in seconds), counted from the start of the request
+    # and shared by every leg: scene lookup, Easynews, scrapers, debrid checks.
+    # When it runs out, we answer with whatever Easynews and the scrapers that
+    # already finished returned; slower scrapers keep running in the background
+    # and write the merged result to the cache for the next request.
+    STREAM_DEADLINE: float = 8.0
+
+    # --- Prefetching ---
+    # After a catalog response, warm the scene cache and search cache for its
+    # first PREFETCH_TOP_N scenes so opening one of them is a cache hit.
+    # Off by default: it trades extra StashDB/scraper traffic for latency.
+    PREFETCH_ENABLED: bool = False
+    PREFETCH_TOP_N: int = 5
+
+    # Max scenes prefetched at once, and max prefetches started per second
+    # (both process-wide, across all catalog requests)
+    PREFETCH_CONCURRENCY: int = 2
+    PREFETCH_RATE: float = 1.0
+
+    # --- HTTP Client ---
+    # A single pooled client is shared by every upstream integration.
+    # Max open connections across all hosts
+    HTTP_POOL_SIZE: int = 100
+
+    # Max open connections to a single host (e.g. api.real-debrid.com)
+    HTTP_POOL_PER_HOST: int = 20
+
+    # How long resolved DNS entries are reused (in seconds)
+    HTTP_DNS_CACHE_TTL: int = 300
+
+    # How long idle keep-alive connections are kept open (in seconds)
+    HTTP_KEEPALIVE_TIMEOUT: float = 30.0
+
+    # Default total timeout for a single upstream request (in seconds)
+    HTTP_TIMEOUT: float = 30.0
+
     # --- Pydantic Configuration ---
     # This tells Pydantic to read from a .env file if present
     model_config = SettingsConfigDict(
@@ -0,0 +1,46 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    In-process request coalescing.
+
+    While a call for a key is running, every other caller asking for the same
+    key awaits that call instead of starting its own, and they all share its
+    result (or exception). Once it finishes, the key is free again.
+    """
+
+    def __init__(self, name: str = "singleflight"):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run fn() once per key at a time and return its result to all callers.
+
+        The work runs in its own task and is shielded, so a caller that gets
+        cancelled (e.g. the client disconnected) does not abort it for the others.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._forget(key, task))
+        else:
+            logger.debug(f"[{self.name}] Joining in-flight call for {key!r}")
+
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+        # Retrieve the exception so an abandoned failing task doesn't log noise
+        if not task.cancelled():
+            task.exception()
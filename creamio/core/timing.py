@@ -0,0 +1,83 @@
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, List, Optional, Tuple, TypeVar
+
+from fastapi import Request
+
+from creamio.core.settings import get_settings
+
+settings = get_settings()
+
+T = TypeVar("T")
+
+# Per-request list of (stage, milliseconds), set up by the server_timing middleware.
+# Tasks spawned while handling the request (scrapers, debrid checks) copy the
+# context and append to the same list.
+_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("timings", default=None)
+
+# Endpoints that report their stages in a Server-Timing header
+TIMED_ENDPOINTS = {"stream", "catalog"}
+
+# Server-Timing metric names must be HTTP tokens
+_TOKEN_RE = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Time a block as a named stage of the current request (no-op outside a request).
+
+        with stage("scene"):
+            scene = await lookup_scene(scene_id)
+    """
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.append((name, (time.perf_counter() - started) * 1000))
+
+
+async def timed(name: str, aw: Awaitable[T]) -> T:
+    """
+    Await `aw` as a named stage (for coroutines handed to gather/as_completed).
+    """
+    with stage(name):
+        return await aw
+
+
+def current_timings() -> List[dict]:
+    """
+    Stages recorded so far for the current request, for the debug JSON block.
+    """
+    return [{"stage": name, "ms": round(ms, 1)} for name, ms in _timings.get() or []]
+
+
+def format_server_timing(timings: List[Tuple[str, float]]) -> str:
+    return ", ".join(f"{_TOKEN_RE.sub('_', name)};dur={ms:.1f}" for name, ms in timings)
+
+
+async def server_timing(request: Request, call_next):
+    """
+    HTTP middleware adding a Server-Timing header with the per-stage
+    durations of /stream and /catalog, plus their total.
+    """
+    timings: List[Tuple[str, float]] = []
+    token = _timings.set(timings)
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        _timings.reset(token)
+
+    endpoint = request.scope.get("endpoint")
+    if endpoint is not None and endpoint.__name__ in TIMED_ENDPOINTS:
+        timings = timings + [("total", (time.perf_counter() - started) * 1000)]
+        response.headers["Server-Timing"] = format_server_timing(timings)
+    return response
@@ -0,0 +1,64 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from creamio.core.settings import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Worker pool for CPU-bound work (HTML parsing) that must not run on the event loop.
+# Created lazily on first use and shut down in the app lifespan.
+_executor: Executor | None = None
+
+
+def _create_executor() -> Executor | None:
+    mode = settings.PARSER_POOL.lower()
+    workers = settings.PARSER_WORKERS or min(4, os.cpu_count() or 1)
+
+    if mode == "process":
+        logger.info(f"Parser pool: {workers} processes")
+        return ProcessPoolExecutor(max_workers=workers)
+    if mode == "thread":
+        logger.info(f"Parser pool: {workers} threads")
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="creamio-parser")
+    if mode != "inline":
+        logger.warning(f"Unknown PARSER_POOL '{settings.PARSER_POOL}', parsing inline")
+    return None
+
+
+def get_parser_executor() -> Executor | None:
+    """
+    Return the parser pool (None means parse inline on the event loop).
+    """
+    global _executor
+    if _executor is None and settings.PARSER_POOL.lower() != "inline":
+        _executor = _create_executor()
+    return _executor
+
+
+async def run_in_parser_pool(fn: Callable[..., T], *args: Any) -> T:
+    """
+    Run fn(*args) in the parser pool and await its result.
+
+    With a process pool, fn must be a module-level function and args/result
+    must be picklable (plain strings in, ScrapeResult/tuples out).
+    """
+    executor = get_parser_executor()
+    if executor is None:
+        return fn(*args)
+    return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+
+def shutdown_parser_pool():
+    """
+    Stop the parser pool. Called when the addon shuts down.
+    """
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
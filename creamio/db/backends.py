@@ -0,0 +1,162 @@
+import logging
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from databases import Database
+
+from creamio.core.settings import get_settings
+
+try:
+    import redis.asyncio as aioredis
+    from redis.exceptions import RedisError
+except ImportError:  # Only needed with CACHE_BACKEND=redis
+    aioredis = None
+    RedisError = Exception
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# The key/value caches a backend stores (the SQLite table names)
+CACHE_TABLES = ("search_cache", "scene_cache", "catalog_cache")
+
+
+class CacheBackend(ABC):
+    """
+    Shared storage behind the search, scene and catalog caches.
+
+    Values are opaque serialized blobs (plain JSON text, or compressed bytes)
+    stored with the time they were cached; freshness is decided by the caller.
+    The in-memory tiers in database.py sit in front of whichever backend is used.
+    """
+
+    name = "base"
+
+    async def connect(self):
+        pass
+
+    async def close(self):
+        pass
+
+    @abstractmethod
+    async def get(self, table: str, key: str) -> Optional[tuple[str | bytes, float]]:
+        """
+        Return (data, timestamp) or None if missing.
+        """
+        pass
+
+    @abstractmethod
+    async def set(self, table: str, key: str, data: str | bytes, timestamp: float, ttl: float):
+        """
+        Store data for key. ttl is the hard expiry (in seconds) after which
+        the entry may be dropped.
+        """
+        pass
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Local tables in the addon's SQLite file (the default).
+    Expired rows are removed by the cache janitor.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, database: Database):
+        self.database = database
+
+    async def get(self, table: str, key: str) -> Optional[tuple[str | bytes, float]]:
+        query = f"SELECT data, timestamp FROM {table} WHERE key = :key"
+        row = await self.database.fetch_one(query, values={"key": key})
+        if row:
+            return row["data"], row["timestamp"]
+        return None
+
+    async def set(self, table: str, key: str, data: str | bytes, timestamp: float, ttl: float):
+        # SQLite 'INSERT OR REPLACE' handles updating existing keys
+        query = f"""
+        INSERT OR REPLACE INTO {table} (key, data, timestamp)
+        VALUES (:key, :data, :timestamp)
+        """
+        await self.database.execute(query, values={
+            "key": key,
+            "data": data,
+            "timestamp": timestamp
+        })
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Redis (or any Redis-protocol server) at REDIS_URL, shared by every worker
+    and every node. Each entry is a hash {data, ts, z} under
+    "creamio:{table}:{key}" and expires on its own via EXPIRE.
+
+    While Redis is unreachable, reads are misses and writes are skipped, so
+    requests go upstream instead of failing.
+    """
+
+    name = "redis"
+    PREFIX = "creamio"
+
+    def __init__(self, url: str):
+        if aioredis is None:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package")
+        self.url = url
+        self.client = None
+
+    async def connect(self):
+        self.client = aioredis.from_url(self.url, max_connections=settings.REDIS_POOL_SIZE)
+        host = self.url.rsplit("@", 1)[-1]
+        try:
+            await self.client.ping()
+        except RedisError as e:
+            # Start anyway; the pool reconnects once Redis is back
+            logger.error(f"[Cache] Redis at {host} is unreachable, caching disabled until it is back: {e}")
+            return
+        logger.info(f"[Cache] Using Redis backend at {host}")
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def _key(self, table: str, key: str) -> str:
+        return f"{self.PREFIX}:{table}:{key}"
+
+    async def get(self, table: str, key: str) -> Optional[tuple[str | bytes, float]]:
+        try:
+            data, ts, compressed = await self.client.hmget(self._key(table, key), "data", "ts", "z")
+        except RedisError as e:
+            logger.warning(f"[Cache] Redis read failed for {table}, treating as a miss: {e}")
+            return None
+        if data is None or ts is None:
+            return None
+        # Redis hands back bytes; only compressed entries stay bytes (see database._unpack)
+        if compressed != b"1":
+            data = data.decode("utf-8")
+        return data, float(ts)
+
+    async def set(self, table: str, key: str, data: str | bytes, timestamp: float, ttl: float):
+        redis_key = self._key(table, key)
+        try:
+            async with self.client.pipeline(transaction=True) as pipe:
+                pipe.hset(redis_key, mapping={
+                    "data": data,
+                    "ts": repr(timestamp),
+                    "z": "1" if isinstance(data, bytes) else "0",
+                })
+                pipe.expire(redis_key, max(1, int(ttl)))
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning(f"[Cache] Redis write failed for {table}, not cached: {e}")
+
+
+def create_cache_backend(database: Database) -> CacheBackend:
+    """
+    Build the backend selected by CACHE_BACKEND ("sqlite" or "redis").
+    """
+    backend = settings.CACHE_BACKEND.lower()
+    if backend == "redis":
+        return RedisCacheBackend(settings.REDIS_URL)
+    if backend != "sqlite":
+        logger.warning(f"Unknown CACHE_BACKEND '{settings.CACHE_BACKEND}', using sqlite")
+    return SQLiteCacheBackend(database)
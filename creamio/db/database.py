@@ -1,13 +1,97 @@
+import asyncio
+import hashlib
+import logging
+import sqlite3
 import time
+import zlib
 import orjson
 from databases import Database
+from creamio.core.cache import TTLCache
 from creamio.core.settings import get_settings
+from creamio.db.backends import create_cache_backend
 
 # Load settings to get the Database URL (sqlite+aiosqlite:///data/creamio.db)
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Applied to every SQLite connection the pool opens (most pragmas are per-connection).
+# journal_mode=WAL is persistent in the file and is set once in init_db.
+SQLITE_PRAGMAS = (
+    # Safe with WAL: only the last transactions can be lost on power failure, never corruption
+    "PRAGMA synchronous=NORMAL",
+    # Wait for a competing writer instead of failing with 'database is locked'
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    # 16 MB page cache, 256 MB memory-mapped reads
+    "PRAGMA cache_size=-16000",
+    "PRAGMA mmap_size=268435456",
+)
+
+
+class TunedConnection(sqlite3.Connection):
+    """
+    sqlite3 connection that applies SQLITE_PRAGMAS as soon as it is opened.
+    Passed to aiosqlite (through databases) as the connection factory.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for pragma in SQLITE_PRAGMAS:
+            self.execute(pragma)
+
+
+def _create_database() -> Database:
+    if settings.DATABASE_URL.startswith("sqlite"):
+        return Database(settings.DATABASE_URL, factory=TunedConnection)
+    return Database(settings.DATABASE_URL)
+
 
 # Initialize the Database instance
-database = Database(settings.DATABASE_URL)
+database = _create_database()
+
+# Set once this process (or the gunicorn master it was forked from) has
+# created the schema, so workers don't all race to run the DDL on startup
+_schema_ready = False
+
+# Where the search/scene/catalog caches live (SQLite tables or Redis),
+# selected by CACHE_BACKEND. Availability and resolved links stay in SQLite.
+cache_backend = create_cache_backend(database)
+
+# In-memory tier in front of the search_cache table, holding (results, timestamp).
+# Hot queries are served without a thread hop to SQLite or re-parsing JSON.
+# Bounded by entry count and by approximate JSON size.
+# Only fresh entries (younger than CACHE_TTL) are kept here: stale lookups go
+# to the backend, where another worker or node may already have refreshed them.
+search_memory_cache = TTLCache(
+    "search",
+    maxsize=settings.SEARCH_CACHE_SIZE,
+    ttl=settings.CACHE_TTL,
+    max_bytes=settings.SEARCH_CACHE_MAX_BYTES
+)
+
+# In-memory LRU in front of the scene_cache table.
+# StashDB scene metadata barely changes, and Stremio asks /meta and /stream
+# for the same scene within seconds, so the hot set is served without SQLite.
+scene_memory_cache = TTLCache("scene", maxsize=settings.SCENE_CACHE_SIZE, ttl=settings.SCENE_CACHE_TTL)
+
+# In-memory LRU in front of the resolved_links table.
+# Players hit the same resolve URL on every seek/reconnect.
+link_memory_cache = TTLCache("link", maxsize=settings.LINK_CACHE_SIZE, ttl=settings.RD_LINK_TTL)
+
+# In-memory tier in front of the catalog_cache table, holding (scenes, timestamp).
+# Trending is the same for every user, so nearly every board load is served here.
+# Entries are kept only while fresh (the page's TTL, given by the caller), so
+# a page refreshed by the leader or another node is picked up from the backend.
+catalog_memory_cache = TTLCache("catalog", maxsize=settings.CATALOG_CACHE_SIZE, ttl=settings.CATALOG_TRENDING_TTL)
+
+# Table -> column the janitor expires rows on
+_EXPIRY_COLUMNS = {
+    "search_cache": "timestamp",
+    "scene_cache": "timestamp",
+    "catalog_cache": "timestamp",
+    "debrid_availability": "timestamp",
+    "resolved_links": "expires",
+}
 
 async def init_db():
     """
@@ -15,6 +99,35 @@ async def init_db():
     This is called when the addon starts.
     """
     await database.connect()
+    if not _schema_ready:
+        await create_schema(database)
+    await cache_backend.connect()
+
+
+def prepare_schema():
+    """
+    Create the schema from a short-lived connection, outside any event loop.
+    Called once by the gunicorn master before it forks the workers.
+    """
+    async def _prepare():
+        db = _create_database()
+        await db.connect()
+        try:
+            await create_schema(db)
+        finally:
+            await db.disconnect()
+
+    asyncio.run(_prepare())
+
+
+async def create_schema(database: Database):
+    """
+    Create the tables and indexes (idempotent) and switch the file to WAL.
+    """
+    global _schema_ready
+
+    # Write-ahead logging: readers don't block the writer (and vice versa)
+    await database.execute("PRAGMA journal_mode=WAL")
     
     # Create the search_cache table
     # key: The search query (e.g., "performer:12345" or "query:anal")
@@ -29,15 +142,164 @@ async def init_db():
     """
     await database.execute(query)
 
+    # Create the scene_cache table
+    # key: The StashDB scene id
+    # data: The JSON scene metadata as returned by StashDBClient.get_scene
+    # timestamp: When this was cached (for TTL expiry)
+    query = """
+    CREATE TABLE IF NOT EXISTS scene_cache (
+        key TEXT PRIMARY KEY,
+        data TEXT NOT NULL,
+        timestamp REAL NOT NULL
+    )
+    """
+    await database.execute(query)
+
+    # Create the catalog_cache table
+    # key: "{catalog id}|{normalized search}|{page}" (empty search = trending)
+    # data: The JSON list of StashDB scenes shown in the catalog
+    # timestamp: When this was cached (freshness is decided by the caller)
+    query = """
+    CREATE TABLE IF NOT EXISTS catalog_cache (
+        key TEXT PRIMARY KEY,
+        data TEXT NOT NULL,
+        timestamp REAL NOT NULL
+    )
+    """
+    await database.execute(query)
+
+    # Create the debrid_availability table
+    # Whether a torrent is cached on a debrid service is the same for every
+    # user, so this is shared across all tokens.
+    # provider: The debrid service (e.g. "realdebrid")
+    # infohash: The torrent infohash (lowercase)
+    # cached: 1 if instantly available, 0 otherwise
+    # timestamp: When this was checked (for TTL expiry)
+    query = """
+    CREATE TABLE IF NOT EXISTS debrid_availability (
+        provider TEXT NOT NULL,
+        infohash TEXT NOT NULL,
+        cached INTEGER NOT NULL,
+        timestamp REAL NOT NULL,
+        PRIMARY KEY (provider, infohash)
+    )
+    """
+    await database.execute(query)
+
+    # Create the resolved_links table
+    # key: "{provider}:{sha256(token)}:{infohash}" (tokens are never stored in clear)
+    # url: The final direct download link
+    # expires: When the provider's link stops being valid
+    query = """
+    CREATE TABLE IF NOT EXISTS resolved_links (
+        key TEXT PRIMARY KEY,
+        url TEXT NOT NULL,
+        expires REAL NOT NULL
+    )
+    """
+    await database.execute(query)
+
+    # Expiry indexes, so the janitor finds expired rows without a full table scan
+    # (lookups themselves go through the primary keys)
+    for table, column in _EXPIRY_COLUMNS.items():
+        await database.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_{column} ON {table} ({column})"
+        )
+
+    _schema_ready = True
+
 
 async def close_db():
     """
     Close the database connection.
     Called when the addon shuts down.
     """
+    await cache_backend.close()
     await database.disconnect()
 
 
+def _pack(data: bytes) -> str | bytes:
+    """
+    Prepare serialized JSON for the data column:
+    text, or zlib-compressed bytes when CACHE_COMPRESSION is on.
+    """
+    if settings.CACHE_COMPRESSION:
+        return zlib.compress(data, settings.CACHE_COMPRESSION_LEVEL)
+    return data.decode("utf-8")
+
+
+def _unpack(data: str | bytes) -> str | bytes:
+    """
+    Inverse of _pack. Rows written before/after toggling compression
+    are both readable: BLOBs are compressed, TEXT is plain JSON.
+    """
+    if isinstance(data, bytes):
+        return zlib.decompress(data)
+    return data
+
+
+def _encode(value) -> str | bytes:
+    return _pack(orjson.dumps(value))
+
+
+def _decode(data: str | bytes):
+    # orjson loads bytes/str significantly faster than std json
+    return orjson.loads(_unpack(data))
+
+
+async def purge_expired() -> int:
+    """
+    Delete expired rows from every cache table, CACHE_JANITOR_BATCH rows per
+    statement so the write lock is only ever held briefly.
+    
+    Returns:
+        Number of rows deleted
+    """
+    now = time.time()
+    cutoffs = {
+        "search_cache": now - settings.CACHE_STALE_TTL,
+        "scene_cache": now - settings.SCENE_CACHE_TTL,
+        "catalog_cache": now - settings.CACHE_STALE_TTL,
+        "debrid_availability": now - settings.AVAILABILITY_CACHE_TTL,
+        "resolved_links": now,
+    }
+
+    total = 0
+    for table, column in _EXPIRY_COLUMNS.items():
+        query = f"""
+        DELETE FROM {table} WHERE rowid IN (
+            SELECT rowid FROM {table} WHERE {column} < :cutoff LIMIT :batch
+        )
+        """
+        while True:
+            async with database.connection() as connection:
+                # databases' execute() returns lastrowid, so read changes() on the same connection
+                await connection.execute(query, values={"cutoff": cutoffs[table], "batch": settings.CACHE_JANITOR_BATCH})
+                deleted = await connection.fetch_val("SELECT changes()")
+            total += deleted
+            if deleted < settings.CACHE_JANITOR_BATCH:
+                break
+            # Let requests in between batches
+            await asyncio.sleep(0)
+
+    return total
+
+
+async def cache_janitor():
+    """
+    Background job: purge expired cache rows every CACHE_JANITOR_INTERVAL.
+    Started from the app lifespan and cancelled on shutdown.
+    """
+    while True:
+        try:
+            deleted = await purge_expired()
+            if deleted:
+                logger.info(f"[Janitor] Purged {deleted} expired cache rows")
+        except Exception as e:
+            logger.error(f"[Janitor] Purge failed: {e}")
+        await asyncio.sleep(settings.CACHE_JANITOR_INTERVAL)
+
+
 async def get_cached_search(key: str) -> list | None:
     """
     Retrieve cached search results if they exist and are not expired.
@@ -48,37 +310,253 @@ async def get_cached_search(key: str) -> list | None:
     Returns:
         List of results (dicts) or None if cache miss/expired
     """
-    query = "SELECT data, timestamp FROM search_cache WHERE key = :key"
-    row = await database.fetch_one(query, values={"key": key})
-    
-    if row:
+    entry = await get_cached_search_entry(key)
+    if entry:
+        results, timestamp = entry
         # Check if the cache entry has expired (TTL from settings)
-        if time.time() - row["timestamp"] < settings.CACHE_TTL:
-            # orjson loads bytes/str significantly faster than std json
-            return orjson.loads(row["data"])
+        if time.time() - timestamp < settings.CACHE_TTL:
+            return results
+            
+    return None
+
+
+async def get_cached_search_entry(key: str) -> tuple[list, float] | None:
+    """
+    Retrieve cached search results together with when they were cached.
+    Used for stale-while-revalidate: entries past CACHE_TTL are still returned
+    until CACHE_STALE_TTL, and the caller decides whether to refresh them.
+    
+    Args:
+        key: The unique search key
+        
+    Returns:
+        (results, timestamp) or None if cache miss/past hard expiry
+    """
+    entry = search_memory_cache.get(key)
+    if entry is not None:
+        return entry
+
+    stored = await cache_backend.get("search_cache", key)
+    
+    if stored:
+        data, timestamp = stored
+        # Hard expiry: past this point stale data is no longer served
+        age = time.time() - timestamp
+        if age < settings.CACHE_STALE_TTL:
+            data = _unpack(data)
+            entry = (orjson.loads(data), timestamp)
+            # Promote to memory for as long as it is fresh
+            if age < settings.CACHE_TTL:
+                search_memory_cache.set(key, entry, ttl=settings.CACHE_TTL - age, size=len(data))
+            return entry
             
     return None
 
 
 async def cache_search_results(key: str, results: list):
     """
-    Save search results to the cache.
+    Save search results to both cache tiers (write-through).
     
     Args:
         key: The unique search key
         results: The list of data to cache
     """
-    # Serialize data to JSON string
-    data_json = orjson.dumps(results).decode("utf-8")
+    # Serialize data to JSON (optionally compressed)
+    data = orjson.dumps(results)
+    timestamp = time.time()
+    search_memory_cache.set(key, (results, timestamp), size=len(data))
+    await cache_backend.set("search_cache", key, _pack(data), timestamp, settings.CACHE_STALE_TTL)
+
+
+async def get_cached_scene(scene_id: str) -> dict | None:
+    """
+    Retrieve cached StashDB scene metadata (memory first, then the cache backend).
+    
+    Args:
+        scene_id: The StashDB scene id (without the 'stashdb:' prefix)
+        
+    Returns:
+        The scene dict or None if cache miss/expired
+    """
+    scene = scene_memory_cache.get(scene_id)
+    if scene is not None:
+        return scene
+
+    stored = await cache_backend.get("scene_cache", scene_id)
+    
+    if stored:
+        data, timestamp = stored
+        age = time.time() - timestamp
+        if age < settings.SCENE_CACHE_TTL:
+            scene = _decode(data)
+            # Promote to memory for the rest of its lifetime
+            scene_memory_cache.set(scene_id, scene, ttl=settings.SCENE_CACHE_TTL - age)
+            return scene
+            
+    return None
+
+
+async def cache_scene(scene_id: str, scene: dict):
+    """
+    Save StashDB scene metadata to both cache tiers.
+    
+    Args:
+        scene_id: The StashDB scene id
+        scene: The scene dict
+    """
+    scene_memory_cache.set(scene_id, scene)
+    await cache_backend.set("scene_cache", scene_id, _encode(scene), time.time(), settings.SCENE_CACHE_TTL)
+
+
+async def get_cached_catalog_entry(key: str, ttl: float) -> tuple[list, float] | None:
+    """
+    Retrieve cached catalog scenes together with when they were cached
+    (memory first, then the cache backend).
+    
+    Args:
+        key: The catalog cache key
+        ttl: How long the page is fresh (only fresh entries are kept in memory)
+        
+    Returns:
+        (scenes, timestamp) or None if cache miss/past CACHE_STALE_TTL
+    """
+    entry = catalog_memory_cache.get(key)
+    if entry is not None:
+        return entry
+
+    stored = await cache_backend.get("catalog_cache", key)
+    
+    if stored:
+        data, timestamp = stored
+        age = time.time() - timestamp
+        if age < settings.CACHE_STALE_TTL:
+            entry = (_decode(data), timestamp)
+            if age < ttl:
+                catalog_memory_cache.set(key, entry, ttl=ttl - age)
+            return entry
+            
+    return None
+
+
+async def cache_catalog(key: str, scenes: list, ttl: float):
+    """
+    Save catalog scenes to both cache tiers.
+    
+    Args:
+        key: The catalog cache key
+        scenes: The list of StashDB scenes
+        ttl: How long the page is fresh (kept in memory that long)
+    """
+    timestamp = time.time()
+    catalog_memory_cache.set(key, (scenes, timestamp), ttl=ttl)
+    await cache_backend.set("catalog_cache", key, _encode(scenes), timestamp, settings.CACHE_STALE_TTL)
+
+
+async def get_cached_availability(provider: str, infohashes: list[str]) -> dict[str, bool]:
+    """
+    Retrieve known debrid availability for a list of infohashes.
+    
+    Args:
+        provider: The debrid service (e.g. "realdebrid")
+        infohashes: Lowercase infohashes to look up
+        
+    Returns:
+        Dict of infohash -> cached for the hashes checked within AVAILABILITY_CACHE_TTL.
+        Unknown or stale hashes are simply absent.
+    """
+    if not infohashes:
+        return {}
+
+    # One named placeholder per hash: WHERE infohash IN (:h0, :h1, ...)
+    values = {f"h{i}": h for i, h in enumerate(infohashes)}
+    values["provider"] = provider
+    values["cutoff"] = time.time() - settings.AVAILABILITY_CACHE_TTL
+    placeholders = ", ".join(f":h{i}" for i in range(len(infohashes)))
+
+    query = f"""
+    SELECT infohash, cached FROM debrid_availability
+    WHERE provider = :provider AND timestamp > :cutoff AND infohash IN ({placeholders})
+    """
+    rows = await database.fetch_all(query, values=values)
+    return {row["infohash"]: bool(row["cached"]) for row in rows}
+
+
+async def cache_availability(provider: str, availability: dict[str, bool]):
+    """
+    Save debrid availability results.
+    
+    Args:
+        provider: The debrid service (e.g. "realdebrid")
+        availability: Dict of infohash -> cached
+    """
+    if not availability:
+        return
+
     timestamp = time.time()
+    query = """
+    INSERT OR REPLACE INTO debrid_availability (provider, infohash, cached, timestamp)
+    VALUES (:provider, :infohash, :cached, :timestamp)
+    """
+    await database.execute_many(query, values=[
+        {"provider": provider, "infohash": h, "cached": int(cached), "timestamp": timestamp}
+        for h, cached in availability.items()
+    ])
+
+
+def _link_key(provider: str, token: str, infohash: str) -> str:
+    token_hash = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    return f"{provider}:{token_hash}:{infohash.lower()}"
+
+
+async def get_cached_link(provider: str, token: str, infohash: str) -> str | None:
+    """
+    Retrieve a still-valid resolved download link (memory first, then SQLite).
+    
+    Args:
+        provider: The debrid service (e.g. "realdebrid", "torbox")
+        token: The user's API token for that service
+        infohash: The torrent infohash
+        
+    Returns:
+        The direct link or None if cache miss/expired
+    """
+    key = _link_key(provider, token, infohash)
+    url = link_memory_cache.get(key)
+    if url is not None:
+        return url
+
+    query = "SELECT url, expires FROM resolved_links WHERE key = :key"
+    row = await database.fetch_one(query, values={"key": key})
     
-    # SQLite 'INSERT OR REPLACE' handles updating existing keys
+    if row:
+        remaining = row["expires"] - time.time()
+        if remaining > 0:
+            link_memory_cache.set(key, row["url"], ttl=remaining)
+            return row["url"]
+            
+    return None
+
+
+async def cache_link(provider: str, token: str, infohash: str, url: str, ttl: float):
+    """
+    Save a resolved download link to both cache tiers.
+    
+    Args:
+        provider: The debrid service
+        token: The user's API token for that service
+        infohash: The torrent infohash
+        url: The direct download link
+        ttl: How long the link stays valid (in seconds)
+    """
+    key = _link_key(provider, token, infohash)
+    link_memory_cache.set(key, url, ttl=ttl)
+
     query = """
-    INSERT OR REPLACE INTO search_cache (key, data, timestamp)
-    VALUES (:key, :data, :timestamp)
+    INSERT OR REPLACE INTO resolved_links (key, url, expires)
+    VALUES (:key, :url, :expires)
     """
     await database.execute(query, values={
         "key": key,
-        "data": data_json,
-        "timestamp": timestamp
+        "url": url,
+        "expires": time.time() + ttl
     })
@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from fastapi import BackgroundTasks
+
+from creamio.core.settings import get_settings
+from creamio.core.singleflight import SingleFlight
+from creamio.core.timing import stage
+from creamio.db.database import get_cached_catalog_entry, cache_catalog
+from creamio.services.stashdb import get_stashdb_client
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# The only catalog the manifest declares
+CATALOG_ID = "stashdb_search"
+
+# Concurrent misses/refreshes for the same catalog page share one StashDB fetch
+catalog_flights = SingleFlight("catalog")
+
+# Strong references to fire-and-forget refresh tasks
+_background_tasks: set = set()
+
+
+def normalize_search(search: str) -> str:
+    """
+    Case- and whitespace-insensitive form of a search, so "Mia  Malkova"
+    and "mia malkova" share one cache entry.
+    """
+    return " ".join(search.split()).casefold()
+
+
+def catalog_key(catalog_id: str, search: str, page: int = 1) -> str:
+    """
+    Cache key of a catalog page; `search` must already be normalized.
+    """
+    return f"{catalog_id}|{search}|{page}"
+
+
+def catalog_ttl(search: str) -> int:
+    """
+    How long a catalog page is fresh: Trending (no search) or a search page.
+    """
+    return settings.CATALOG_SEARCH_TTL if search else settings.CATALOG_TRENDING_TTL
+
+
+async def get_catalog_scenes(
+    catalog_id: str,
+    search: str = "",
+    page: int = 1,
+    background_tasks: Optional[BackgroundTasks] = None
+) -> List[Dict[str, Any]]:
+    """
+    Return the scenes of a catalog page from catalog_cache, fetching from StashDB on a miss.
+
+    Entries older than CATALOG_TRENDING_TTL / CATALOG_SEARCH_TTL are still
+    returned immediately and refreshed in the background.
+    """
+    # Normalized once: a blank search is Trending, for the key and the fetch alike
+    search = normalize_search(search)
+    key = catalog_key(catalog_id, search, page)
+    ttl = catalog_ttl(search)
+    with stage("catalog-cache"):
+        entry = await get_cached_catalog_entry(key, ttl)
+    # Empty pages are not worth serving, treat them as a miss
+    if entry and entry[0]:
+        scenes, timestamp = entry
+        if time.time() - timestamp < ttl:
+            logger.info(f"[Catalog] Cache Hit: {len(scenes)} scenes")
+        else:
+            logger.info(f"[Catalog] Stale Hit: {len(scenes)} scenes, refreshing in background")
+            if background_tasks is not None:
+                background_tasks.add_task(refresh_catalog, catalog_id, search, page)
+            else:
+                task = asyncio.ensure_future(refresh_catalog(catalog_id, search, page))
+                _background_tasks.add(task)
+                task.add_done_callback(_background_tasks.discard)
+        return scenes
+
+    with stage("stashdb"):
+        return await catalog_flights.do(key, lambda: _fetch(key, search, page, ttl))
+
+
+async def refresh_catalog(catalog_id: str, search: str = "", page: int = 1, max_age: Optional[float] = None):
+    """
+    Re-fetch a catalog page from StashDB and overwrite its cache entry,
+    unless the cached page is younger than max_age (default: its TTL).
+    """
+    search = normalize_search(search)
+    key = catalog_key(catalog_id, search, page)
+    max_age = catalog_ttl(search) if max_age is None else max_age
+    try:
+        await catalog_flights.do(key, lambda: _fetch(key, search, page, max_age))
+    except Exception as e:
+        logger.error(f"[Catalog] Refresh failed for '{key}': {e}")
+
+
+async def _fetch(key: str, search: str, page: int, max_age: float) -> List[Dict[str, Any]]:
+    ttl = catalog_ttl(search)
+    # The leader's refresher or another worker/node may have refreshed the
+    # page in the shared backend since this worker's lookup
+    entry = await get_cached_catalog_entry(key, ttl)
+    if entry and entry[0] and time.time() - entry[1] < max_age:
+        return entry[0]
+
+    scenes = await fetch_scenes(search, page)
+    # Empty usually means StashDB failed; keep serving the previous page
+    if scenes:
+        await cache_catalog(key, scenes, ttl)
+    return scenes
+
+
+async def fetch_scenes(search: str, page: int = 1) -> List[Dict[str, Any]]:
+    """
+    Fetch a catalog page straight from StashDB.
+    No search = Trending; otherwise performer scenes, falling back to title search.
+    """
+    client = get_stashdb_client()
+
+    if not search:
+        logger.info("[Catalog] Fetching Trending Scenes")
+        return await client.search_scenes("", page=page)
+
+    logger.info(f"[Catalog] Searching StashDB for: '{search}'")
+
+    # Performer first (High priority for "Mia Malkova"), falling back to scene titles
+    scenes, is_performer = await client.search_performer_or_scenes(search, page=page)
+    if is_performer:
+        logger.info(f"[Catalog] Found {len(scenes)} scenes via Performer lookup")
+    else:
+        logger.info(f"[Catalog] Performer lookup empty. Found {len(scenes)} scenes by title")
+    return scenes
+
+
+async def trending_refresher():
+    """
+    Background job: refresh the trending page every CATALOG_REFRESH_INTERVAL,
+    so home-screen loads are always served from the cache.
+    Started from the app lifespan and cancelled on shutdown.
+    """
+    while True:
+        try:
+            # Skips the fetch after a quick restart if the cached page is still recent
+            await refresh_catalog(CATALOG_ID, max_age=settings.CATALOG_REFRESH_INTERVAL)
+        except Exception as e:
+            logger.error(f"[Catalog] Trending refresh failed: {e}")
+        await asyncio.sleep(settings.CATALOG_REFRESH_INTERVAL)
@@ -0,0 +1,98 @@
+import hashlib
+import time
+from typing import Any, Dict, Optional
+
+from creamio.core.cache import TTLCache
+from creamio.core.settings import get_settings
+from creamio.core.singleflight import SingleFlight
+
+settings = get_settings()
+
+# Concurrent syncs of the same user's library share one upstream listing
+library_flights = SingleFlight("library")
+
+
+class LibraryIndex:
+    """
+    Local index of the torrents already in one user's debrid account.
+
+    Maps infohash -> provider entry (torrent id, status, links/files) so the
+    resolvers can reuse an existing torrent instead of adding the magnet again.
+    """
+
+    def __init__(self, provider: str, owner: str):
+        self.provider = provider
+        # sha256 of the user's token, never the token itself
+        self.owner = owner
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.synced_at = 0.0
+        # Changes made while a full listing is being fetched (None = removed),
+        # replayed on top of it so a sync doesn't undo them
+        self._changes: Optional[Dict[str, Optional[Dict[str, Any]]]] = None
+        # Last failed sync, so a broken account isn't re-synced on every resolve
+        self.failed_at = 0.0
+
+    def get(self, infohash: str) -> Optional[Dict[str, Any]]:
+        return self.entries.get(infohash.lower())
+
+    def put(self, infohash: str, entry: Dict[str, Any]):
+        self.entries[infohash.lower()] = entry
+        if self._changes is not None:
+            self._changes[infohash.lower()] = entry
+
+    def pop(self, infohash: str):
+        self.entries.pop(infohash.lower(), None)
+        if self._changes is not None:
+            self._changes[infohash.lower()] = None
+
+    def begin_sync(self):
+        """
+        Start recording changes, call before fetching a full listing.
+        """
+        self._changes = {}
+
+    def replace(self, entries: Dict[str, Dict[str, Any]]):
+        """
+        Swap in a full listing from the provider, keeping the changes
+        made since begin_sync().
+        """
+        for infohash, entry in (self._changes or {}).items():
+            if entry is None:
+                entries.pop(infohash, None)
+            else:
+                entries[infohash] = entry
+        self._changes = None
+        self.entries = entries
+        self.synced_at = time.time()
+
+    def mark_failed(self):
+        """
+        Record a failed sync. The index counts as fresh for LIBRARY_SYNC_RETRY
+        seconds after it, so resolves fall back to adding the magnet instead.
+        """
+        self._changes = None
+        self.failed_at = time.time()
+
+    def is_stale(self, ttl: float) -> bool:
+        now = time.time()
+        if now - self.failed_at < settings.LIBRARY_SYNC_RETRY:
+            return False
+        return now - self.synced_at > ttl
+
+
+# One index per (provider, token), bounded so idle users age out
+_indexes = TTLCache("library", maxsize=settings.LIBRARY_INDEX_SIZE, ttl=settings.LIBRARY_INDEX_TTL)
+
+
+def get_library_index(provider: str, token: str) -> LibraryIndex:
+    """
+    Return the library index for a user, creating an empty one if needed.
+    """
+    owner = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    key = (provider, owner)
+    index = _indexes.get(key)
+    if index is None:
+        index = LibraryIndex(provider, owner)
+    # Re-set on every access so active users don't expire
+    _indexes.set(key, index)
+    return index
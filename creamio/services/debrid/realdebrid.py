@@ -1,106 +1,256 @@
+import asyncio
 import logging
 import aiohttp
 from typing import List, Dict, Any, Optional
 
+from creamio.core.http import get_http_session
+from creamio.core.metrics import register_upstream
+from creamio.core.settings import get_settings
+from creamio.db.database import get_cached_availability, cache_availability
+from creamio.services.debrid.library import LibraryIndex, get_library_index, library_flights
+
 logger = logging.getLogger(__name__)
+settings = get_settings()
 
 class RealDebrid:
     """
     Real Debrid API Client.
     """
-    BASE_URL = "https://api.real-debrid.com/rest/1.0"
+    BASE_URL = settings.REALDEBRID_API_URL
+    PROVIDER = "realdebrid"
 
-    def __init__(self, api_key: str, ip: str = None):
+    def __init__(self, api_key: str, ip: str = None, session: Optional[aiohttp.ClientSession] = None):
         self.api_key = api_key
         self.headers = {"Authorization": f"Bearer {api_key}"}
+        # Shared pooled session (defaults to the process-wide client)
+        self.session = session or get_http_session()
         # RD requires strictly no simultaneous requests from different IPs on same token
         # We pass the user's IP if needed for proxies, but usually for Addons the server IP is fine
         # unless we are proxying the stream.
 
-    async def check_availability(self, infohashes: List[str]) -> Dict[str, bool]:
+    async def check_availability(self, infohashes: List[str], timeout: Optional[float] = None) -> Dict[str, bool]:
         """
         Check if torrents are instantly available on RD servers.
         API Endpoint: /torrents/instantAvailability/{hash1}/{hash2}...
+
+        Results are cached per infohash for AVAILABILITY_CACHE_TTL and shared
+        across all tokens; only unknown or stale hashes are sent upstream.
+        The timeout only bounds that upstream check: when it fires, the
+        cached answers are still returned.
         """
         if not infohashes:
             return {}
 
+        # Deduplicate while keeping order
+        hashes = list(dict.fromkeys(h.lower() for h in infohashes))
+        available_hashes = await get_cached_availability(self.PROVIDER, hashes)
+        missing = [h for h in hashes if h not in available_hashes]
+
+        if not missing:
+            return available_hashes
+
         # RD limits URL length, so we batch requests (e.g. 20 hashes at a time)
+        # and issue the batches concurrently with a bounded limit
+        limiter = asyncio.Semaphore(settings.RD_AVAILABILITY_CONCURRENCY)
+        batches = [missing[i:i+20] for i in range(0, len(missing), 20)]
+        try:
+            results = await asyncio.wait_for(
+                asyncio.gather(*(self._check_batch(batch, limiter) for batch in batches)),
+                timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"[RealDebrid] Availability check timed out after {timeout:.1f}s, {len(missing)} hashes unchecked")
+            return available_hashes
+
+        fresh = {}
+        for batch_result in results:
+            fresh.update(batch_result)
+        await cache_availability(self.PROVIDER, fresh)
+
+        available_hashes.update(fresh)
+        return available_hashes
+
+    async def _check_batch(self, batch: List[str], limiter: asyncio.Semaphore) -> Dict[str, bool]:
+        """
+        Check a single instantAvailability batch. Failed batches return {} (nothing is cached).
+        """
+        url = f"{self.BASE_URL}/torrents/instantAvailability/{'/'.join(batch)}"
         available_hashes = {}
         
-        async with aiohttp.ClientSession() as session:
-            for i in range(0, len(infohashes), 20):
-                batch = infohashes[i:i+20]
-                url = f"{self.BASE_URL}/torrents/instantAvailability/{'/'.join(batch)}"
+        try:
+            async with limiter:
+                async with self.session.get(url, headers=self.headers) as response:
+                    if response.status != 200:
+                        logger.warning(f"[RealDebrid] Availability check failed: {response.status}")
+                        return {}
+                    
+                    data = await response.json()
                 
-                try:
-                    async with session.get(url, headers=self.headers) as response:
-                        if response.status != 200:
-                            logger.warning(f"[RealDebrid] Availability check failed: {response.status}")
-                            continue
-                        
-                        data = await response.json()
+            # Parse response.
+            # Format: { "hash": { "rd": [ { "filename": "...", "filesize": ... } ] } }
+            # If "rd" key exists and is not empty, it is cached.
+            for h in batch:
+                if h in data and "rd" in data[h] and data[h]["rd"]:
+                    available_hashes[h] = True
+                else:
+                    available_hashes[h] = False
                         
-                        # Parse response.
-                        # Format: { "hash": { "rd": [ { "filename": "...", "filesize": ... } ] } }
-                        # If "rd" key exists and is not empty, it is cached.
-                        for h in batch:
-                            h = h.lower()
-                            if h in data and "rd" in data[h] and data[h]["rd"]:
-                                available_hashes[h] = True
-                            else:
-                                available_hashes[h] = False
-                                
-                except Exception as e:
-                    logger.error(f"[RealDebrid] Error checking availability: {e}")
+        except Exception as e:
+            logger.error(f"[RealDebrid] Error checking availability: {e}")
+            return {}
 
         return available_hashes
 
     async def resolve_stream(self, magnet: str, infohash: str) -> Optional[str]:
         """
         Convert a magnet link or infohash into a streamable URL.
-        1. Add magnet to RD
-        2. Select all files
+        1. Reuse the torrent if it is already in the user's RD library
+        2. Otherwise add the magnet and select all files
         3. Get the download link
         4. Unrestrict the link
         """
-        async with aiohttp.ClientSession() as session:
-            try:
-                # 1. Add Magnet
-                add_url = f"{self.BASE_URL}/torrents/addMagnet"
-                async with session.post(add_url, headers=self.headers, data={"magnet": magnet}) as resp:
-                    if resp.status != 201:
-                        logger.error(f"[RealDebrid] Failed to add magnet: {resp.status}")
-                        return None
-                    data = await resp.json()
-                    torrent_id = data["id"]
-
-                # 2. Select Files (We select 'all' to ensure we get the video)
-                select_url = f"{self.BASE_URL}/torrents/selectFiles/{torrent_id}"
-                async with session.post(select_url, headers=self.headers, data={"files": "all"}) as resp:
-                    if resp.status not in (202, 204):
-                         logger.error(f"[RealDebrid] Failed to select files: {resp.status}")
-
-                # 3. Get Torrent Info (to get the link)
-                info_url = f"{self.BASE_URL}/torrents/info/{torrent_id}"
-                async with session.get(info_url, headers=self.headers) as resp:
-                    info = await resp.json()
-                
-                if not info.get("links"):
+        try:
+            index = await self._library_index()
+
+            # 1. Existing torrent: no addMagnet, no duplicate in the account
+            entry = index.get(infohash)
+            if entry:
+                if not entry.get("links"):
+                    # Not finished at the last sync, check its current state
+                    if entry.get("status") == "waiting_files_selection":
+                        await self._select_files(entry["id"])
+                    info = await self._torrent_info(entry["id"])
+                    if info is None:
+                        # Deleted from the account since the last sync
+                        index.pop(infohash)
+                        entry = None
+                    else:
+                        entry = _library_entry(info)
+                        index.put(infohash, entry)
+
+            if entry:
+                if not entry["links"]:
+                    logger.info(f"[RealDebrid] {infohash} is in the library but not ready yet")
                     return None
-                
-                # We typically take the largest file or the first one
-                # For simplicity, we take the first generated link
-                link_to_unrestrict = info["links"][0]
+                link = await self._unrestrict(entry["links"][0])
+                if link:
+                    logger.info(f"[RealDebrid] Reused library torrent {entry['id']}")
+                    return link
+                # Link went away with the torrent, add it again below
+                index.pop(infohash)
 
-                # 4. Unrestrict Link
-                unrestrict_url = f"{self.BASE_URL}/unrestrict/link"
-                async with session.post(unrestrict_url, headers=self.headers, data={"link": link_to_unrestrict}) as resp:
-                    if resp.status != 200:
-                        return None
-                    item = await resp.json()
-                    return item["download"]
+            # 2. Add Magnet and Select Files (We select 'all' to ensure we get the video)
+            add_url = f"{self.BASE_URL}/torrents/addMagnet"
+            async with self.session.post(add_url, headers=self.headers, data={"magnet": magnet}) as resp:
+                if resp.status != 201:
+                    logger.error(f"[RealDebrid] Failed to add magnet: {resp.status}")
+                    return None
+                data = await resp.json()
+                torrent_id = data["id"]
 
-            except Exception as e:
-                logger.error(f"[RealDebrid] Resolve error: {e}")
+            await self._select_files(torrent_id)
+
+            # 3. Get Torrent Info (to get the link)
+            info = await self._torrent_info(torrent_id)
+            if info is None:
+                return None
+            entry = _library_entry(info)
+            index.put(infohash, entry)
+
+            if not entry["links"]:
                 return None
+
+            # We typically take the largest file or the first one
+            # For simplicity, we take the first generated link
+            # 4. Unrestrict Link
+            return await self._unrestrict(entry["links"][0])
+
+        except Exception as e:
+            logger.error(f"[RealDebrid] Resolve error: {e}")
+            return None
+
+    async def _select_files(self, torrent_id: str):
+        select_url = f"{self.BASE_URL}/torrents/selectFiles/{torrent_id}"
+        async with self.session.post(select_url, headers=self.headers, data={"files": "all"}) as resp:
+            if resp.status not in (202, 204):
+                logger.error(f"[RealDebrid] Failed to select files: {resp.status}")
+
+    async def _torrent_info(self, torrent_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Fetch /torrents/info for a torrent. None if it no longer exists.
+        """
+        info_url = f"{self.BASE_URL}/torrents/info/{torrent_id}"
+        async with self.session.get(info_url, headers=self.headers) as resp:
+            if resp.status != 200:
+                logger.warning(f"[RealDebrid] Torrent info failed for {torrent_id}: {resp.status}")
+                return None
+            return await resp.json()
+
+    async def _unrestrict(self, link: str) -> Optional[str]:
+        unrestrict_url = f"{self.BASE_URL}/unrestrict/link"
+        async with self.session.post(unrestrict_url, headers=self.headers, data={"link": link}) as resp:
+            if resp.status != 200:
+                return None
+            item = await resp.json()
+            return item["download"]
+
+    async def _library_index(self) -> LibraryIndex:
+        """
+        Return the user's library index, re-syncing it when older than RD_LIBRARY_TTL.
+        Concurrent resolves for the same token share one sync.
+        """
+        index = get_library_index(self.PROVIDER, self.api_key)
+        if index.is_stale(settings.RD_LIBRARY_TTL):
+            await library_flights.do((self.PROVIDER, index.owner), lambda: self._sync_library(index))
+        return index
+
+    async def _sync_library(self, index: LibraryIndex):
+        """
+        Page through /torrents and rebuild the index. On failure the previous
+        index is kept and the sync is retried after LIBRARY_SYNC_RETRY.
+        """
+        url = f"{self.BASE_URL}/torrents"
+        page_size = settings.RD_LIBRARY_PAGE_SIZE
+        entries = {}
+        index.begin_sync()
+
+        try:
+            for page in range(1, settings.RD_LIBRARY_MAX_PAGES + 1):
+                params = {"page": page, "limit": page_size}
+                async with self.session.get(url, headers=self.headers, params=params) as resp:
+                    # 204 = no (more) torrents
+                    if resp.status == 204:
+                        break
+                    if resp.status != 200:
+                        logger.warning(f"[RealDebrid] Library sync failed: {resp.status}")
+                        index.mark_failed()
+                        return
+                    torrents = await resp.json()
+
+                for torrent in torrents:
+                    if torrent.get("hash"):
+                        entries[torrent["hash"].lower()] = _library_entry(torrent)
+
+                if len(torrents) < page_size:
+                    break
+        except Exception as e:
+            logger.error(f"[RealDebrid] Library sync error: {e}")
+            index.mark_failed()
+            return
+
+        index.replace(entries)
+        logger.info(f"[RealDebrid] Library synced: {len(entries)} torrents")
+
+
+register_upstream(RealDebrid.BASE_URL, "RealDebrid")
+
+
+def _library_entry(torrent: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The subset of an RD torrent (from /torrents or /torrents/info) kept in the index.
+    """
+    return {
+        "id": torrent["id"],
+        "status": torrent.get("status"),
+        "links": torrent.get("links") or [],
+    }
@@ -1,20 +1,32 @@
+import asyncio
 import logging
 import aiohttp
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional
+from creamio.core.http import get_http_session
+from creamio.core.metrics import register_upstream
+from creamio.core.settings import get_settings
+from creamio.services.debrid.library import LibraryIndex, get_library_index, library_flights
 from creamio.services.scrapers.base import ScrapeResult
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Strong references to background library syncs (asyncio only keeps weak ones)
+_background_tasks: set = set()
 
 class TorBox:
     """
     TorBox API Client.
     Docs: https://torbox.app/api
     """
-    BASE_URL = "https://api.torbox.app/v1/api"
+    BASE_URL = settings.TORBOX_API_URL
+    PROVIDER = "torbox"
 
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, session: Optional[aiohttp.ClientSession] = None):
         self.api_key = api_key
         self.headers = {"Authorization": f"Bearer {api_key}"}
+        # Shared pooled session (defaults to the process-wide client)
+        self.session = session or get_http_session()
 
     async def search_internal(self, query: str) -> List[ScrapeResult]:
         """
@@ -24,87 +36,178 @@ class TorBox:
         params = {"query": query}
         
         results = []
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.get(url, headers=self.headers, params=params) as resp:
-                    if resp.status != 200:
-                        return []
-                    
-                    data = await resp.json()
-                    # Parse TorBox specific response structure
-                    # This structure assumes standard TorBox output, may need adjustment
-                    items = data.get("data", [])
-                    for item in items:
-                        results.append(ScrapeResult(
-                            title=item.get("name", "Unknown"),
-                            infohash=item.get("hash", ""),
-                            size=item.get("size", 0),
-                            seeders=item.get("seeds", 0),
-                            source="TorBoxCache",
-                            magnet=None # Usually not needed if we have hash + it's cached
-                        ))
-            except Exception as e:
-                logger.error(f"[TorBox] Search error: {e}")
+        try:
+            async with self.session.get(url, headers=self.headers, params=params) as resp:
+                if resp.status != 200:
+                    return []
                 
+                data = await resp.json()
+                # Parse TorBox specific response structure
+                # This structure assumes standard TorBox output, may need adjustment
+                items = data.get("data", [])
+                for item in items:
+                    results.append(ScrapeResult(
+                        title=item.get("name", "Unknown"),
+                        infohash=item.get("hash", ""),
+                        size=item.get("size", 0),
+                        seeders=item.get("seeds", 0),
+                        source="TorBoxCache",
+                        magnet=None # Usually not needed if we have hash + it's cached
+                    ))
+        except Exception as e:
+            logger.error(f"[TorBox] Search error: {e}")
+            
         return results
 
     async def resolve_stream(self, magnet: str, infohash: str) -> Optional[str]:
         """
         Get a streamable URL from TorBox.
-        1. Add Torrent/Magnet
-        2. Request link
+        1. Look the torrent up in the user's library index, else add the magnet
+        2. Fetch that single torrent's file list if we don't have it yet
+        3. Request link
         """
-        async with aiohttp.ClientSession() as session:
-            try:
-                # 1. Create Torrent
-                create_url = f"{self.BASE_URL}/torrents/create"
-                form_data = {"magnet": magnet, "seed": "1", "allow_zip": "false"}
-                
-                async with session.post(create_url, headers=self.headers, data=form_data) as resp:
-                    if resp.status != 200:
-                        logger.error(f"[TorBox] Failed to add magnet: {await resp.text()}")
-                        return None
-                    
-                    data = await resp.json()
-                    # Data should contain the torrent_id or a success message
-                    # If it's already cached, it might return success immediately
-                    
-                    if not data.get("success"):
-                         return None
-
-                    torrent_id = data.get("data", {}).get("torrent_id")
-                    if not torrent_id:
-                        # Sometimes it returns the ID directly or in a different field
-                        return None
-
-                # 2. Get Request Link (Unrestrict)
-                # In TorBox, we ask for the download link of the file
-                # First we need to list the files to find the video
-                info_url = f"{self.BASE_URL}/torrents/mylist"
-                async with session.get(info_url, headers=self.headers) as resp:
-                    mylist = await resp.json()
-                    
-                # Find our torrent in the list
-                target = next((t for t in mylist.get("data", []) if t["id"] == torrent_id), None)
-                
-                if not target:
-                    return None
-                    
-                # Get the first file ID (assuming single video file for simplicity)
-                files = target.get("files", [])
-                if not files:
+        try:
+            # Kept current torrent by torrent; a full mylist load runs in the
+            # background and never holds up a resolve
+            index = self._library_index()
+            entry = index.get(infohash)
+
+            if entry and entry["files"]:
+                link = await self._request_link(entry["id"], entry["files"][0]["id"])
+                if link:
+                    logger.info(f"[TorBox] Reused library torrent {entry['id']}")
+                    return link
+                # Torrent was removed from the account, add it again
+                index.pop(infohash)
+                entry = None
+
+            if entry:
+                torrent_id = entry["id"]
+            else:
+                torrent_id = await self._create_torrent(magnet)
+                if not torrent_id:
                     return None
-                    
-                file_id = files[0]["id"]
-                
-                # 3. Request Download Link
-                link_url = f"{self.BASE_URL}/torrents/requestdl"
-                async with session.get(link_url, headers=self.headers, params={"token": self.api_key, "torrent_id": torrent_id, "file_id": file_id}) as resp:
-                     if resp.status != 200:
-                         return None
-                     link_data = await resp.json()
-                     return link_data.get("data")
-
-            except Exception as e:
-                logger.error(f"[TorBox] Resolve error: {e}")
+
+            # 2. Get Request Link (Unrestrict)
+            # In TorBox, we ask for the download link of the file
+            # First we need to list the files to find the video
+            target = await self._torrent_info(torrent_id)
+            if not target:
+                index.pop(infohash)
+                return None
+
+            # Get the first file ID (assuming single video file for simplicity)
+            files = target.get("files") or []
+            index.put(infohash, {"id": torrent_id, "files": files})
+            if not files:
+                return None
+
+            # 3. Request Download Link
+            return await self._request_link(torrent_id, files[0]["id"])
+
+        except Exception as e:
+            logger.error(f"[TorBox] Resolve error: {e}")
+            return None
+
+    async def _create_torrent(self, magnet: str) -> Optional[int]:
+        """
+        Add a magnet to the account and return its torrent id.
+        """
+        create_url = f"{self.BASE_URL}/torrents/create"
+        form_data = {"magnet": magnet, "seed": "1", "allow_zip": "false"}
+
+        async with self.session.post(create_url, headers=self.headers, data=form_data) as resp:
+            if resp.status != 200:
+                logger.error(f"[TorBox] Failed to add magnet: {await resp.text()}")
+                return None
+
+            data = await resp.json()
+            # Data should contain the torrent_id or a success message
+            # If it's already cached, it might return success immediately
+
+            if not data.get("success"):
                 return None
+
+            # Sometimes it returns the ID directly or in a different field
+            return (data.get("data") or {}).get("torrent_id")
+
+    async def _torrent_info(self, torrent_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Fetch a single torrent (with its files) via mylist?id=, instead of the whole list.
+        """
+        info_url = f"{self.BASE_URL}/torrents/mylist"
+        params = {"id": torrent_id, "bypass_cache": "true"}
+        async with self.session.get(info_url, headers=self.headers, params=params) as resp:
+            if resp.status != 200:
+                logger.warning(f"[TorBox] Torrent info failed for {torrent_id}: {resp.status}")
+                return None
+            data = (await resp.json()).get("data")
+
+        # With an id TorBox returns the torrent object itself
+        if isinstance(data, list):
+            return next((t for t in data if t.get("id") == torrent_id), None)
+        return data
+
+    def _library_index(self) -> LibraryIndex:
+        """
+        Return the user's library index as it is now. When it is missing or
+        older than TB_LIBRARY_TTL, a full re-sync is started in the background;
+        concurrent resolves for the same token share it.
+        """
+        index = get_library_index(self.PROVIDER, self.api_key)
+        if index.is_stale(settings.TB_LIBRARY_TTL):
+            task = asyncio.ensure_future(
+                library_flights.do((self.PROVIDER, index.owner), lambda: self._sync_library(index))
+            )
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+        return index
+
+    async def _sync_library(self, index: LibraryIndex):
+        """
+        Page through /torrents/mylist and rebuild the index. On failure the
+        previous index is kept and the sync is retried after LIBRARY_SYNC_RETRY.
+        """
+        url = f"{self.BASE_URL}/torrents/mylist"
+        page_size = settings.TB_LIBRARY_PAGE_SIZE
+        entries = {}
+        index.begin_sync()
+
+        try:
+            for page in range(settings.TB_LIBRARY_MAX_PAGES):
+                params = {"offset": page * page_size, "limit": page_size, "bypass_cache": "true"}
+                async with self.session.get(url, headers=self.headers, params=params) as resp:
+                    if resp.status != 200:
+                        logger.warning(f"[TorBox] Library sync failed: {resp.status}")
+                        index.mark_failed()
+                        return
+                    torrents = (await resp.json()).get("data") or []
+
+                for torrent in torrents:
+                    if torrent.get("hash"):
+                        entries[torrent["hash"].lower()] = {
+                            "id": torrent["id"],
+                            "files": torrent.get("files") or [],
+                        }
+
+                if len(torrents) < page_size:
+                    break
+        except Exception as e:
+            logger.error(f"[TorBox] Library sync error: {e}")
+            index.mark_failed()
+            return
+
+        index.replace(entries)
+        logger.info(f"[TorBox] Library synced: {len(entries)} torrents")
+
+    async def _request_link(self, torrent_id: int, file_id: int) -> Optional[str]:
+        link_url = f"{self.BASE_URL}/torrents/requestdl"
+        params = {"token": self.api_key, "torrent_id": torrent_id, "file_id": file_id}
+        async with self.session.get(link_url, headers=self.headers, params=params) as resp:
+            if resp.status != 200:
+                return None
+            link_data = await resp.json()
+            return link_data.get("data")
+
+
+register_upstream(TorBox.BASE_URL, "TorBox")
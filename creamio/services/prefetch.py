@@ -0,0 +1,91 @@
+import asyncio
+import logging
+from typing import List
+
+from creamio.core.settings import get_settings
+from creamio.db.database import get_cached_scene, get_cached_search, cache_scene
+from creamio.services.search import build_search_query, lookup_scene, search_torrents
+from creamio.services.stashdb import get_stashdb_client
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class RateLimiter:
+    """
+    Spaces out calls to at most `rate` per second (process-wide, no bursts).
+    A rate of 0 disables the limit.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+
+    async def wait(self):
+        now = asyncio.get_running_loop().time()
+        delay = self._next - now
+        self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+# Shared by every catalog response, so the upstream load of prefetching is
+# bounded globally rather than per request
+_limiter = RateLimiter(settings.PREFETCH_RATE)
+_slots = asyncio.Semaphore(settings.PREFETCH_CONCURRENCY)
+
+# Scene ids queued or being prefetched right now
+_pending: set = set()
+
+
+async def prefetch_scenes(scene_ids: List[str]):
+    """
+    Warm the scene cache and search_cache for the first PREFETCH_TOP_N scenes
+    of a catalog response, so opening one of them is a cache hit.
+    Meant to run after the response is sent (FastAPI BackgroundTasks).
+    """
+    todo = [s for s in scene_ids[:settings.PREFETCH_TOP_N] if s not in _pending]
+    if not todo:
+        return
+
+    _pending.update(todo)
+    try:
+        await _warm_scenes(todo)
+        await asyncio.gather(*(_prefetch(scene_id) for scene_id in todo))
+    finally:
+        _pending.difference_update(todo)
+
+
+async def _warm_scenes(scene_ids: List[str]):
+    """
+    Fetch every uncached scene in one batched StashDB request.
+    """
+    missing = [s for s in scene_ids if await get_cached_scene(s) is None]
+    if not missing:
+        return
+    try:
+        scenes = await get_stashdb_client().get_scenes(missing)
+    except Exception as e:
+        logger.error(f"[Prefetch] Scene batch failed: {e}")
+        return
+    for scene_id, scene in scenes.items():
+        await cache_scene(scene_id, scene)
+
+
+async def _prefetch(scene_id: str):
+    try:
+        # Already warm: costs nothing upstream, so don't spend rate on it
+        scene = await get_cached_scene(scene_id)
+        if scene and await get_cached_search(build_search_query(scene)):
+            return
+
+        async with _slots:
+            await _limiter.wait()
+            scene = await lookup_scene(scene_id)
+            if not scene:
+                return
+            # Cold scrapes share the single-flight with real /stream requests
+            torrents = await search_torrents(build_search_query(scene))
+            logger.info(f"[Prefetch] Warmed {scene_id}: {len(torrents)} torrents")
+    except Exception as e:
+        logger.error(f"[Prefetch] Failed for {scene_id}: {e}")
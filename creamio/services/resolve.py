@@ -0,0 +1,39 @@
+import logging
+from typing import Awaitable, Callable, Optional
+
+from creamio.core.singleflight import SingleFlight
+from creamio.db.database import get_cached_link, cache_link
+
+logger = logging.getLogger(__name__)
+
+# Players often fire several requests for the same resolve URL at once
+# (range requests, retries); only one of them runs the provider flow.
+resolve_flights = SingleFlight("resolve")
+
+
+async def resolve_link(
+    provider: str,
+    token: str,
+    infohash: str,
+    ttl: float,
+    resolver: Callable[[], Awaitable[Optional[str]]]
+) -> Optional[str]:
+    """
+    Return the direct download link for (provider, token, infohash).
+
+    Served from the link cache while valid; otherwise resolver() runs the
+    provider's resolve flow once and its result is cached for ttl seconds.
+    """
+    link = await get_cached_link(provider, token, infohash)
+    if link:
+        logger.info(f"[Resolve] Link cache hit for {provider} {infohash}")
+        return link
+
+    async def _resolve() -> Optional[str]:
+        link = await resolver()
+        if link:
+            await cache_link(provider, token, infohash, link, ttl)
+        return link
+
+    key = (provider, token, infohash.lower())
+    return await resolve_flights.do(key, _resolve)
@@ -1,11 +1,85 @@
+import asyncio
 import logging
+import re
+import time
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import Any, Callable, Dict, List, Optional, TypeVar
 
 import aiohttp
 from pydantic import BaseModel
 
+from creamio.core.metrics import register_upstream
+from creamio.core.settings import get_settings
+from creamio.core.workers import run_in_parser_pool
+from creamio.services.scrapers.health import SiteHealth, get_site_health
+
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+T = TypeVar("T")
+
+# Infohash inside a magnet link (btih:HASH), standard 40-char hex string
+HASH_RE = re.compile(r"btih:([a-zA-Z0-9]{40})")
+
+# One semaphore per site, shared by every scraper instance in the process.
+# Bounds how many pages we fetch from a single site at once, across all searches.
+_site_limiters: Dict[str, asyncio.Semaphore] = {}
+
+
+def has_class(name: str) -> str:
+    """
+    XPath predicate matching elements whose class list contains `name`
+    (the XPath equivalent of the CSS selector `.name`).
+    """
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def parse_size(size_text: str) -> int:
+    """
+    Convert a "1.2 GB" / "700 MB" size string to bytes (0 if unknown).
+    """
+    size_text = size_text.strip()
+    if "GB" in size_text:
+        return int(float(size_text.replace("GB", "").strip()) * 1024**3)
+    if "MB" in size_text:
+        return int(float(size_text.replace("MB", "").strip()) * 1024**2)
+    return 0
+
+
+class ParsedRows(list):
+    """
+    Results of an lxml row parser, plus how many rows its XPath matched.
+    """
+
+    def __init__(self, results: List[Any], matched: int):
+        super().__init__(results)
+        self.matched = matched
+
+
+def parse_with_engine(engine: str, lxml_parser: Callable, bs4_parser: Callable, html: str, *args: Any):
+    """
+    Run a page through the selected parser engine.
+
+    "lxml" uses the precompiled XPath parser and falls back to BeautifulSoup
+    when the page layout isn't recognised: the parser fails, returns None, or
+    returns ParsedRows where rows matched but none could be parsed.
+    "bs4" goes straight to BeautifulSoup.
+    Module-level so it can run in the parser pool.
+    """
+    if engine == "lxml":
+        try:
+            results = lxml_parser(html, *args)
+            if isinstance(results, ParsedRows):
+                if results or not results.matched:
+                    return list(results)
+                logger.debug(f"lxml parser matched {results.matched} rows but parsed none, falling back to BeautifulSoup")
+            elif results is not None:
+                return results
+            else:
+                logger.debug("lxml parser did not recognise the page, falling back to BeautifulSoup")
+        except Exception as e:
+            logger.debug(f"lxml parser failed ({e}), falling back to BeautifulSoup")
+    return bs4_parser(html, *args)
 
 
 class ScrapeResult(BaseModel):
@@ -40,28 +114,120 @@ class BaseScraper(ABC):
         self.proxy = proxy
         self.site_name = "Generic"
 
-    async def get_soup(self, url: str):
+    @property
+    def limiter(self) -> asyncio.Semaphore:
         """
-        Helper method to fetch a URL and return BeautifulSoup object.
-        Useful for HTML parsing.
+        Per-site concurrency limiter (SCRAPER_SITE_CONCURRENCY).
         """
-        from bs4 import BeautifulSoup
+        limiter = _site_limiters.get(self.site_name)
+        if limiter is None:
+            limiter = asyncio.Semaphore(settings.SCRAPER_SITE_CONCURRENCY)
+            _site_limiters[self.site_name] = limiter
+        return limiter
 
+    @property
+    def health(self) -> SiteHealth:
+        """
+        Per-site circuit breaker and latency tracker.
+        """
+        return get_site_health(self.site_name)
+
+    async def fetch_html(self, url: str) -> Optional[str]:
+        """
+        Helper method to fetch a URL and return its HTML.
+
+        Requests to a site whose circuit is open return None immediately,
+        and the timeout adapts to the site's observed latency. The timeout
+        covers waiting for the per-site limiter as well as the fetch.
+        """
+        # Label this site's requests in the upstream metrics
+        register_upstream(url, self.site_name)
+
+        health = self.health
+        allowed, probe = health.allow_request()
+        if not allowed:
+            logger.debug(f"[{self.site_name}] Circuit open, skipping {url}")
+            return None
+
+        # The site's timeout bounds the wait for a limiter slot plus the fetch,
+        # so a busy site can't hold a search past its deadline in the queue
+        timeout = health.timeout(probe)
+        queued = started = time.monotonic()
         try:
-            async with self.session.get(
-                url, 
-                headers=self.headers, 
-                proxy=self.proxy, 
-                timeout=15
-            ) as response:
-                if response.status != 200:
-                    logger.warning(f"[{self.site_name}] Failed to fetch {url}: Status {response.status}")
-                    return None
-                
-                html = await response.text()
-                return BeautifulSoup(html, "lxml")
+            try:
+                await asyncio.wait_for(self.limiter.acquire(), timeout)
+            except asyncio.TimeoutError:
+                # Our own backlog, not the site's fault: no breaker failure
+                logger.warning(f"[{self.site_name}] No free slot within {timeout:.1f}s, skipping {url}")
+                return None
+
+            try:
+                started = time.monotonic()
+                # aiohttp treats a zero timeout as none at all
+                budget = max(timeout - (started - queued), 0.01)
+                async with self.session.get(
+                    url, 
+                    headers=self.headers, 
+                    proxy=self.proxy, 
+                    timeout=aiohttp.ClientTimeout(total=budget)
+                ) as response:
+                    if response.status != 200:
+                        logger.warning(f"[{self.site_name}] Failed to fetch {url}: Status {response.status}")
+                        # Server errors, rate limiting and blocks count against the site.
+                        # Anything else (e.g. 404) still proves the site is up.
+                        if response.status >= 500 or response.status in (403, 429):
+                            health.record_failure(probe)
+                        else:
+                            health.record_success(time.monotonic() - started, probe)
+                        return None
+                    
+                    html = await response.text()
+                health.record_success(time.monotonic() - started, probe)
+            finally:
+                self.limiter.release()
+        except asyncio.TimeoutError:
+            logger.error(f"[{self.site_name}] Timed out after {timeout:.1f}s: {url}")
+            # A fetch left with a sliver of the budget after queueing says
+            # nothing about the site; only count it if it had a fair chance
+            elapsed = time.monotonic() - started
+            if elapsed >= settings.SCRAPER_TIMEOUT_MIN:
+                health.record_failure(probe, timed_out_after=elapsed)
+            return None
         except Exception as e:
             logger.error(f"[{self.site_name}] Connection error: {e}")
+            health.record_failure(probe)
+            return None
+        finally:
+            # No-op unless this request was the probe and got cancelled
+            if probe:
+                health.release_probe()
+
+        return html
+
+    @property
+    def parser_engine(self) -> str:
+        """
+        Parser engine for this site: SCRAPER_PARSER_OVERRIDES[site_name] or SCRAPER_PARSER.
+        """
+        return settings.SCRAPER_PARSER_OVERRIDES.get(self.site_name, settings.SCRAPER_PARSER).lower()
+
+    async def parse_page(self, lxml_parser: Callable[..., T], bs4_parser: Callable[..., T], html: str, *args: Any) -> Optional[T]:
+        """
+        Parse a page with this site's parser engine, in the parser pool.
+        """
+        return await self.parse(parse_with_engine, self.parser_engine, lxml_parser, bs4_parser, html, *args)
+
+    async def parse(self, parser: Callable[..., T], *args: Any) -> Optional[T]:
+        """
+        Run a parse function in the parser pool, off the event loop.
+
+        Parse functions are module-level (picklable for the process pool),
+        take the raw HTML and return plain results.
+        """
+        try:
+            return await run_in_parser_pool(parser, *args)
+        except Exception as e:
+            logger.error(f"[{self.site_name}] Parse error: {e}")
             return None
 
     @abstractmethod
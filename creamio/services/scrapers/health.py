@@ -0,0 +1,139 @@
+import logging
+import time
+from collections import deque
+from typing import Dict, Tuple
+
+from creamio.core.settings import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class SiteHealth:
+    """
+    Health tracking for a single torrent site.
+
+    - Circuit breaker: after SCRAPER_BREAKER_THRESHOLD consecutive failures the
+      circuit opens and requests are skipped instantly. After
+      SCRAPER_BREAKER_COOLDOWN seconds it goes half-open and lets a single probe
+      through; a successful probe closes it, a failed one re-opens it.
+    - Adaptive timeout: derived from the p95 of recently observed latencies,
+      clamped to [SCRAPER_TIMEOUT_MIN, SCRAPER_TIMEOUT_MAX]. Timeouts count as
+      samples too (as a lower bound), so a site that slowed down gets a longer
+      timeout instead of failing at the old one. Probes always get the max.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    # Below this many samples we don't trust the percentiles yet
+    MIN_SAMPLES = 5
+
+    def __init__(self, site_name: str):
+        self.site_name = site_name
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.latencies: deque = deque(maxlen=settings.SCRAPER_LATENCY_WINDOW)
+
+    def allow_request(self) -> Tuple[bool, bool]:
+        """
+        Whether a request to this site should be attempted right now.
+
+        Returns:
+            (allowed, probe): probe is True when this request took the
+            half-open probe slot. Only that request may report the outcome
+            that closes or re-opens the circuit, and must release the slot.
+        """
+        if self.state == self.CLOSED:
+            return True, False
+
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < settings.SCRAPER_BREAKER_COOLDOWN:
+                return False, False
+            logger.info(f"[{self.site_name}] Circuit half-open, probing")
+            self.state = self.HALF_OPEN
+
+        # Half-open: only one probe at a time
+        if self.probe_in_flight:
+            return False, False
+        self.probe_in_flight = True
+        return True, True
+
+    def record_success(self, latency: float, probe: bool = False):
+        if probe:
+            # Latencies from before the outage no longer describe the site
+            self.latencies.clear()
+        self.latencies.append(latency)
+        if probe:
+            self.probe_in_flight = False
+            logger.info(f"[{self.site_name}] Circuit closed")
+            self.state = self.CLOSED
+        # A straggler sent before the circuit opened says nothing about now
+        if self.state == self.CLOSED:
+            self.consecutive_failures = 0
+
+    def record_failure(self, probe: bool = False, timed_out_after: float | None = None):
+        """
+        Args:
+            timed_out_after: for timeouts, how long the request ran. The real
+                latency is at least that, so it goes into the window.
+        """
+        if timed_out_after is not None:
+            self.latencies.append(timed_out_after)
+
+        if probe:
+            self.probe_in_flight = False
+        elif self.state != self.CLOSED:
+            # Straggler from before the circuit opened, already accounted for
+            return
+
+        self.consecutive_failures += 1
+        if probe or self.consecutive_failures >= settings.SCRAPER_BREAKER_THRESHOLD:
+            logger.warning(
+                f"[{self.site_name}] Circuit open after {self.consecutive_failures} failures, "
+                f"skipping for {settings.SCRAPER_BREAKER_COOLDOWN}s"
+            )
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def release_probe(self):
+        """
+        Free the half-open probe slot if the probe ended without an outcome
+        (e.g. it was cancelled), so the breaker can't get stuck half-open.
+        Only the request that took the slot may call this.
+        """
+        self.probe_in_flight = False
+
+    def percentile(self, pct: float) -> float | None:
+        if len(self.latencies) < self.MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(pct * len(ordered)))]
+
+    def timeout(self, probe: bool = False) -> float:
+        """
+        Request timeout for this site (in seconds).
+        A half-open probe gets SCRAPER_TIMEOUT_MAX, so a site that only got
+        slower can close its circuit again.
+        """
+        p95 = self.percentile(0.95)
+        if probe or p95 is None:
+            return settings.SCRAPER_TIMEOUT_MAX
+        return min(
+            settings.SCRAPER_TIMEOUT_MAX,
+            max(settings.SCRAPER_TIMEOUT_MIN, p95 * settings.SCRAPER_TIMEOUT_MULTIPLIER)
+        )
+
+
+# Process-wide registry, one entry per site_name
+_site_health: Dict[str, SiteHealth] = {}
+
+
+def get_site_health(site_name: str) -> SiteHealth:
+    health = _site_health.get(site_name)
+    if health is None:
+        health = _site_health[site_name] = SiteHealth(site_name)
+    return health
@@ -1,11 +1,14 @@
 import asyncio
 import logging
-from typing import List
+from typing import List, Optional
 
 import aiohttp
-from rapidfuzz import fuzz, process
+import numpy as np
+from rapidfuzz import fuzz, process, utils
 
+from creamio.core.http import get_http_session
 from creamio.core.settings import get_settings
+from creamio.core.timing import timed
 from creamio.services.scrapers.base import ScrapeResult
 from creamio.services.scrapers.thepiratebay import ThePirateBayScraper
 from creamio.services.scrapers.x1337 import X1337Scraper
@@ -19,51 +22,71 @@ class ScraperManager:
     Orchestrates multiple scrapers in parallel and aggregates results.
     """
     
-    def __init__(self):
+    def __init__(self, session: aiohttp.ClientSession | None = None):
+        # Shared pooled session (keep-alive connections survive across searches)
+        self.session = session or get_http_session()
         self.scrapers = [
             ThePirateBayScraper,
             X1337Scraper,
             TorrentGalaxyScraper
         ]
 
-    async def search(self, query: str, limit: int = 20) -> List[ScrapeResult]:
+    async def search(self, query: str, limit: int = 20, sink: Optional[List[ScrapeResult]] = None) -> List[ScrapeResult]:
         """
         Run all scrapers for the given query.
         
         Args:
             query: Search term (e.g. "Riley Reid Blacked")
             limit: Max results to return
+            sink: Optional list that receives each scraper's raw results as soon
+                  as that scraper finishes (lets callers peek at partial results)
         """
-        results: List[ScrapeResult] = []
+        results = await self.gather(query, sink)
+        return self.rank(query, results, limit)
+
+    async def gather(self, query: str, sink: Optional[List[ScrapeResult]] = None) -> List[ScrapeResult]:
+        """
+        Run all scrapers concurrently and collect their raw (unranked) results.
+        """
+        results: List[ScrapeResult] = [] if sink is None else sink
+        
+        # Initialize all scraper instances
+        scraper_instances = [
+            cls(
+                session=self.session, 
+                user_agent=settings.USER_AGENT,
+                proxy=settings.SCRAPE_PROXY
+            ) 
+            for cls in self.scrapers
+        ]
+        
+        # Run .scrape() for all of them concurrently
+        tasks = [
+            timed(f"scrape-{scraper.site_name}", scraper.scrape(query))
+            for scraper in scraper_instances
+        ]
+        
+        logger.info(f"Starting scraping for: {query}")
         
-        async with aiohttp.ClientSession() as session:
-            # Initialize all scraper instances
-            scraper_instances = [
-                cls(
-                    session=session, 
-                    user_agent=settings.USER_AGENT,
-                    proxy=settings.SCRAPE_PROXY
-                ) 
-                for cls in self.scrapers
-            ]
-            
-            # Run .scrape() for all of them concurrently
-            # return_exceptions=True prevents one scraper from crashing the whole batch
-            tasks = [
-                scraper.scrape(query) 
-                for scraper in scraper_instances
-            ]
-            
-            logger.info(f"Starting scraping for: {query}")
-            all_results_raw = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            # Flatten list and handle exceptions
-            for res in all_results_raw:
-                if isinstance(res, list):
-                    results.extend(res)
-                elif isinstance(res, Exception):
-                    logger.error(f"Scraper task failed: {res}")
+        # Collect results as each scraper finishes, so fast sites are visible early.
+        # Exceptions are caught per task to prevent one scraper from crashing the whole batch
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                results.extend(await next_done)
+            except Exception as e:
+                logger.error(f"Scraper task failed: {e}")
 
+        return results
+
+    @staticmethod
+    def rank(query: str, results: List[ScrapeResult], limit: int = 20) -> List[ScrapeResult]:
+        """
+        Deduplicate raw scraper results and sort them by relevance.
+
+        All titles are scored against the query in one batched rapidfuzz call.
+        Results matching below RANK_MIN_SCORE are dropped, the rest are sorted
+        by match score (in RANK_SCORE_BUCKET-wide buckets), then seeders, then size.
+        """
         # Deduplicate by Infohash
         unique_results = {}
         for r in results:
@@ -75,22 +98,35 @@ class ScraperManager:
                 unique_results[r.infohash] = r
         
         final_results = list(unique_results.values())
+        if not final_results:
+            return []
+
+        # token_set_ratio handles partial matches well; default_process lowercases
+        # and turns the dots/dashes of release names into spaces.
+        # Scores below the cutoff come back as 0.
+        cutoff = settings.RANK_MIN_SCORE
+        scores = process.cdist(
+            [query],
+            [r.title for r in final_results],
+            scorer=fuzz.token_set_ratio,
+            processor=utils.default_process,
+            score_cutoff=cutoff
+        )[0]
+        count = len(final_results)
+        seeders = np.fromiter((r.seeders for r in final_results), dtype=np.int64, count=count)
+        sizes = np.fromiter((r.size for r in final_results), dtype=np.int64, count=count)
+
+        keep = np.flatnonzero(scores >= cutoff) if cutoff > 0 else np.arange(count)
+
+        # Raw float scores almost never tie; bucket them so seeders/size still count
+        buckets = np.floor(scores[keep] / max(settings.RANK_SCORE_BUCKET, 1))
 
-        # Sort by fuzzy match relevance + seeders
-        # We give 70% weight to fuzzy match score and 30% to seeders (normalized)
-        if final_results:
-            # Pre-calculate fuzzy scores
-            for res in final_results:
-                # Simple token_set_ratio handles partial matches well
-                score = fuzz.token_set_ratio(query.lower(), res.title.lower())
-                # Store score temporarily on object (dynamic attribute)
-                setattr(res, "_score", score)
-            
-            # Sort descending
-            final_results.sort(
-                key=lambda x: (getattr(x, "_score", 0), x.seeders), 
-                reverse=True
-            )
+        # Sort descending: lexsort's last key is the primary one
+        order = keep[np.lexsort((-sizes[keep], -seeders[keep], -buckets))]
+        ranked = [final_results[i] for i in order[:limit]]
 
-        logger.info(f"Aggregated {len(final_results)} unique results for '{query}'")
-        return final_results[:limit]
+        logger.info(
+            f"Aggregated {count} unique results for '{query}' "
+            f"({count - len(keep)} below the match cutoff)"
+        )
+        return ranked
@@ -1,17 +1,31 @@
 import logging
 import re
-from typing import List
-from creamio.services.scrapers.base import BaseScraper, ScrapeResult
+from typing import List, Optional
+
+from lxml import etree
+
+from creamio.core.settings import get_settings
+from creamio.services.scrapers.base import HASH_RE, BaseScraper, ParsedRows, ScrapeResult, has_class
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Precompiled XPath expressions for the lxml parser engine
+_ROWS = etree.XPath(f"//table[@id='searchResult']//tr[not({has_class('header')})]")
+_TITLE = etree.XPath(f"string((.//div[{has_class('detName')}]/a)[1])", smart_strings=False)
+_MAGNET = etree.XPath("(.//a[starts-with(@href, 'magnet:')]/@href)[1]", smart_strings=False)
+_CELLS = etree.XPath("./td")
+_DESC = etree.XPath(f"(.//font[{has_class('detDesc')}])[1]")
+
+_SIZE_RE = re.compile(r"Size ([\d\.]+)\s([KMGT]i?B)")
+_SIZE_MULTIPLIERS = {'KiB': 1024, 'MiB': 1024**2, 'GiB': 1024**3, 'TiB': 1024**4}
 
 class ThePirateBayScraper(BaseScraper):
     def __init__(self, session, user_agent, proxy=None):
         super().__init__(session, user_agent, proxy)
         self.site_name = "ThePirateBay"
-        # We use a reliable proxy mirror if the main site is down, 
-        # but ideally this base URL should be configurable or rotated.
-        self.base_url = "https://tpb.party" 
+        # A proxy mirror by default, the main site is often down (see TPB_URL)
+        self.base_url = settings.TPB_URL
 
     async def scrape(self, query: str) -> List[ScrapeResult]:
         """
@@ -22,77 +36,151 @@ class ThePirateBayScraper(BaseScraper):
         # 500 = Porn category
         search_url = f"{self.base_url}/search/{query}/1/7/500"
         
-        soup = await self.get_soup(search_url)
-        if not soup:
+        html = await self.fetch_html(search_url)
+        if not html:
             return []
 
-        results = []
+        # Parsing is CPU-bound, run it in the parser pool
+        results = await self.parse_page(
+            parse_search_page_lxml, parse_search_page, html, self.site_name
+        ) or []
+
+        logger.info(f"[{self.site_name}] Found {len(results)} results for '{query}'")
+        return results
+
+
+def _parse_size(desc_text: str) -> int:
+    """
+    Size is inside a font tag with class 'detDesc', e.g. "Uploaded 02-28 2009, Size 209.88 MiB, ULed by..."
+    We parse this loosely and use 0 if it can't be found.
+    """
+    # Regex to find "Size 123.45 MiB"
+    size_match = _SIZE_RE.search(desc_text)
+    if not size_match:
+        return 0
+    val = float(size_match.group(1))
+    unit = size_match.group(2)
+    # Simple converter
+    return int(val * _SIZE_MULTIPLIERS.get(unit, 1))
+
+
+def parse_search_page(html: str, site_name: str) -> List[ScrapeResult]:
+    """
+    Parse a TPB search results page with BeautifulSoup.
+    Module-level so it can run in the parser pool (threads or processes).
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "lxml")
+    results = []
+    
+    try:
+        # TPB table rows are usually <tr class="header">...</tr> followed by data rows
+        # We skip the header
+        rows = soup.select("table#searchResult tr:not(.header)")
         
+        for row in rows:
+            try:
+                # 1. Title
+                title_tag = row.select_one("div.detName a")
+                if not title_tag:
+                    continue
+                title = title_tag.text.strip()
+
+                # 2. Magnet & Infohash
+                # The magnet link is usually the second 'a' tag in the second 'td' or explicitly select by href^="magnet:"
+                magnet_tag = row.select_one("a[href^='magnet:']")
+                if not magnet_tag:
+                    continue
+                magnet = magnet_tag["href"]
+                
+                # Extract infohash from magnet link (btih:HASH)
+                # Standard regex for 40-char hex string
+                hash_match = HASH_RE.search(magnet)
+                if not hash_match:
+                    continue
+                infohash = hash_match.group(1).lower()
+
+                # 3. Seeders
+                # Seeders are in the 3rd column (td aligned right)
+                tds = row.find_all("td")
+                if len(tds) < 3:
+                    continue
+                seeders = int(tds[2].text.strip())
+
+                # 4. Size
+                desc_tag = row.select_one("font.detDesc")
+                size = _parse_size(desc_tag.text) if desc_tag else 0
+
+                results.append(ScrapeResult(
+                    title=title,
+                    infohash=infohash,
+                    magnet=magnet,
+                    seeders=seeders,
+                    size=size,
+                    source=site_name
+                ))
+
+            except Exception as e:
+                logger.debug(f"[{site_name}] Error parsing row: {e}")
+                continue
+
+    except Exception as e:
+        logger.error(f"[{site_name}] Parse error: {e}")
+
+    return results
+
+
+def parse_search_page_lxml(html: str, site_name: str) -> Optional[ParsedRows]:
+    """
+    Parse a TPB search results page with precompiled lxml XPath expressions.
+    """
+    root = etree.HTML(html)
+    if root is None:
+        return None
+
+    rows = _ROWS(root)
+    results = []
+    
+    for row in rows:
         try:
-            # TPB table rows are usually <tr class="header">...</tr> followed by data rows
-            # We skip the header
-            rows = soup.select("table#searchResult tr:not(.header)")
+            # 1. Title
+            title = _TITLE(row).strip()
+            if not title:
+                continue
+
+            # 2. Magnet & Infohash
+            magnets = _MAGNET(row)
+            if not magnets:
+                continue
+            magnet = magnets[0]
             
-            for row in rows:
-                try:
-                    # 1. Title
-                    title_tag = row.select_one("div.detName a")
-                    if not title_tag:
-                        continue
-                    title = title_tag.text.strip()
-
-                    # 2. Magnet & Infohash
-                    # The magnet link is usually the second 'a' tag in the second 'td' or explicitly select by href^="magnet:"
-                    magnet_tag = row.select_one("a[href^='magnet:']")
-                    if not magnet_tag:
-                        continue
-                    magnet = magnet_tag["href"]
-                    
-                    # Extract infohash from magnet link (btih:HASH)
-                    # Standard regex for 40-char hex string
-                    hash_match = re.search(r"btih:([a-zA-Z0-9]{40})", magnet)
-                    if not hash_match:
-                        continue
-                    infohash = hash_match.group(1).lower()
-
-                    # 3. Seeders
-                    # Seeders are in the 3rd column (td aligned right)
-                    tds = row.find_all("td")
-                    if len(tds) < 3:
-                        continue
-                    seeders = int(tds[2].text.strip())
-
-                    # 4. Size
-                    # Size is inside a font tag with class 'detDesc', e.g. "Uploaded 02-28 2009, Size 209.88 MiB, ULed by..."
-                    # We parse this loosely or use 0 if complex
-                    desc_tag = row.select_one("font.detDesc")
-                    size = 0
-                    if desc_tag:
-                        desc_text = desc_tag.text
-                        # Regex to find "Size 123.45 MiB"
-                        size_match = re.search(r"Size ([\d\.]+)\s([KMGT]i?B)", desc_text)
-                        if size_match:
-                            val = float(size_match.group(1))
-                            unit = size_match.group(2)
-                            # Simple converter
-                            multipliers = {'KiB': 1024, 'MiB': 1024**2, 'GiB': 1024**3, 'TiB': 1024**4}
-                            size = int(val * multipliers.get(unit, 1))
-
-                    results.append(ScrapeResult(
-                        title=title,
-                        infohash=infohash,
-                        magnet=magnet,
-                        seeders=seeders,
-                        size=size,
-                        source=self.site_name
-                    ))
-
-                except Exception as e:
-                    logger.debug(f"[{self.site_name}] Error parsing row: {e}")
-                    continue
+            hash_match = HASH_RE.search(magnet)
+            if not hash_match:
+                continue
+            infohash = hash_match.group(1).lower()
+
+            # 3. Seeders (3rd column)
+            tds = _CELLS(row)
+            if len(tds) < 3:
+                continue
+            seeders = int("".join(tds[2].itertext()).strip())
+
+            # 4. Size
+            desc = _DESC(row)
+            size = _parse_size("".join(desc[0].itertext())) if desc else 0
+
+            results.append(ScrapeResult(
+                title=title,
+                infohash=infohash,
+                magnet=magnet,
+                seeders=seeders,
+                size=size,
+                source=site_name
+            ))
 
         except Exception as e:
-            logger.error(f"[{self.site_name}] Parse error: {e}")
+            logger.debug(f"[{site_name}] Error parsing row: {e}")
+            continue
 
-        logger.info(f"[{self.site_name}] Found {len(results)} results for '{query}'")
-        return results
+    return ParsedRows(results, len(rows))
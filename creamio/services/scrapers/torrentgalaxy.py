@@ -1,15 +1,26 @@
 import logging
-import re
-from typing import List
-from creamio.services.scrapers.base import BaseScraper, ScrapeResult
+from typing import List, Optional
+
+from lxml import etree
+
+from creamio.core.settings import get_settings
+from creamio.services.scrapers.base import HASH_RE, BaseScraper, ParsedRows, ScrapeResult, has_class, parse_size
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Precompiled XPath expressions for the lxml parser engine
+_ROWS = etree.XPath(f"//div[{has_class('tgxtable')}]//div[{has_class('tgxtablerow')}]")
+_TITLE_LINK = etree.XPath("(.//a[contains(@class, 'txlight')])[1]")
+_MAGNET = etree.XPath("(.//a[starts-with(@href, 'magnet:')]/@href)[1]", smart_strings=False)
+_SEEDERS = etree.XPath("string((.//font[@color='green'])[1])", smart_strings=False)
+_SIZE = etree.XPath(f"(.//span[{has_class('badge')} and {has_class('badge-secondary')}])[1]")
 
 class TorrentGalaxyScraper(BaseScraper):
     def __init__(self, session, user_agent, proxy=None):
         super().__init__(session, user_agent, proxy)
         self.site_name = "TorrentGalaxy"
-        self.base_url = "https://torrentgalaxy.to"
+        self.base_url = settings.TORRENTGALAXY_URL
 
     async def scrape(self, query: str) -> List[ScrapeResult]:
         """
@@ -22,70 +33,134 @@ class TorrentGalaxyScraper(BaseScraper):
         # c[3]=1 (XXX MP4), c[4]=1 (XXX HD)
         search_url = f"{self.base_url}/torrents.php?search={query}&c3=1&c4=1&sort=seeders&order=desc"
         
-        soup = await self.get_soup(search_url)
-        if not soup:
+        html = await self.fetch_html(search_url)
+        if not html:
             return []
 
-        results = []
+        # Parsing is CPU-bound, run it in the parser pool
+        results = await self.parse_page(
+            parse_search_page_lxml, parse_search_page, html, self.site_name
+        ) or []
+
+        logger.info(f"[{self.site_name}] Found {len(results)} results for '{query}'")
+        return results
+
+
+def parse_search_page(html: str, site_name: str) -> List[ScrapeResult]:
+    """
+    Parse a TorrentGalaxy search results page with BeautifulSoup.
+    Module-level so it can run in the parser pool (threads or processes).
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "lxml")
+    results = []
+    
+    try:
+        # Rows are class 'tgxtablerow'
+        rows = soup.select("div.tgxtable div.tgxtablerow")
         
+        for row in rows:
+            try:
+                # 1. Title
+                # Inside div.tgxtablecell.clickable-row -> a.txlight
+                title_tag = row.select_one("a[class*='txlight']")
+                if not title_tag:
+                    continue
+                title = title_tag["title"]
+
+                # 2. Magnet & Infohash
+                # Usually a direct magnet button: a[role='button'][href^='magnet:']
+                magnet_tag = row.select_one("a[href^='magnet:']")
+                if not magnet_tag:
+                    continue
+                magnet = magnet_tag["href"]
+                
+                hash_match = HASH_RE.search(magnet)
+                if not hash_match:
+                    continue
+                infohash = hash_match.group(1).lower()
+
+                # 3. Seeders
+                # Seeders are in a span usually colored green or defined column
+                # TGx layout varies, but often it's: font[color='green']
+                seeders_tag = row.select_one("font[color='green']")
+                seeders = int(seeders_tag.text.strip()) if seeders_tag else 0
+
+                # 4. Size
+                # Size is often in a span class 'badge' or just text in a cell
+                # We look for the cell that contains file size format
+                size_tag = row.select_one("span.badge.badge-secondary")
+                size = parse_size(size_tag.text) if size_tag else 0
+
+                results.append(ScrapeResult(
+                    title=title,
+                    infohash=infohash,
+                    magnet=magnet,
+                    seeders=seeders,
+                    size=size,
+                    source=site_name
+                ))
+                
+            except Exception as e:
+                logger.debug(f"[{site_name}] Error parsing row: {e}")
+                continue
+
+    except Exception as e:
+        logger.error(f"[{site_name}] Parse error: {e}")
+
+    return results
+
+
+def parse_search_page_lxml(html: str, site_name: str) -> Optional[ParsedRows]:
+    """
+    Parse a TorrentGalaxy search results page with precompiled lxml XPath expressions.
+    """
+    root = etree.HTML(html)
+    if root is None:
+        return None
+
+    rows = _ROWS(root)
+    results = []
+    
+    for row in rows:
         try:
-            # Rows are class 'tgxtablerow'
-            rows = soup.select("div.tgxtable div.tgxtablerow")
+            # 1. Title
+            title_links = _TITLE_LINK(row)
+            if not title_links or title_links[0].get("title") is None:
+                continue
+            title = title_links[0].get("title")
+
+            # 2. Magnet & Infohash
+            magnets = _MAGNET(row)
+            if not magnets:
+                continue
+            magnet = magnets[0]
             
-            for row in rows:
-                try:
-                    # 1. Title
-                    # Inside div.tgxtablecell.clickable-row -> a.txlight
-                    title_tag = row.select_one("a[class*='txlight']")
-                    if not title_tag:
-                        continue
-                    title = title_tag["title"]
-
-                    # 2. Magnet & Infohash
-                    # Usually a direct magnet button: a[role='button'][href^='magnet:']
-                    magnet_tag = row.select_one("a[href^='magnet:']")
-                    if not magnet_tag:
-                        continue
-                    magnet = magnet_tag["href"]
-                    
-                    hash_match = re.search(r"btih:([a-zA-Z0-9]{40})", magnet)
-                    if not hash_match:
-                        continue
-                    infohash = hash_match.group(1).lower()
-
-                    # 3. Seeders
-                    # Seeders are in a span usually colored green or defined column
-                    # TGx layout varies, but often it's: font[color='green']
-                    seeders_tag = row.select_one("font[color='green']")
-                    seeders = int(seeders_tag.text.strip()) if seeders_tag else 0
-
-                    # 4. Size
-                    # Size is often in a span class 'badge' or just text in a cell
-                    # We look for the cell that contains file size format
-                    size_tag = row.select_one("span.badge.badge-secondary")
-                    size = 0
-                    if size_tag:
-                        size_text = size_tag.text.strip()
-                        if "GB" in size_text:
-                            size = int(float(size_text.replace("GB", "").strip()) * 1024**3)
-                        elif "MB" in size_text:
-                            size = int(float(size_text.replace("MB", "").strip()) * 1024**2)
-
-                    results.append(ScrapeResult(
-                        title=title,
-                        infohash=infohash,
-                        magnet=magnet,
-                        seeders=seeders,
-                        size=size,
-                        source=self.site_name
-                    ))
-                    
-                except Exception as e:
-                    logger.debug(f"[{self.site_name}] Error parsing row: {e}")
-                    continue
+            hash_match = HASH_RE.search(magnet)
+            if not hash_match:
+                continue
+            infohash = hash_match.group(1).lower()
+
+            # 3. Seeders
+            seeders_text = _SEEDERS(row).strip()
+            seeders = int(seeders_text) if seeders_text else 0
+
+            # 4. Size
+            size_tags = _SIZE(row)
+            size = parse_size("".join(size_tags[0].itertext())) if size_tags else 0
 
+            results.append(ScrapeResult(
+                title=title,
+                infohash=infohash,
+                magnet=magnet,
+                seeders=seeders,
+                size=size,
+                source=site_name
+            ))
+            
         except Exception as e:
-            logger.error(f"[{self.site_name}] Parse error: {e}")
+            logger.debug(f"[{site_name}] Error parsing row: {e}")
+            continue
 
-        logger.info(f"[{self.site_name}] Found {len(results)} results for '{query}'")
-        return results
+    return ParsedRows(results, len(rows))
@@ -1,37 +1,44 @@
+import asyncio
 import logging
-import re
-from typing import List
-from creamio.services.scrapers.base import BaseScraper, ScrapeResult
+from typing import List, Optional, Tuple
+
+from lxml import etree
+
+from creamio.core.settings import get_settings
+from creamio.services.scrapers.base import HASH_RE, BaseScraper, ParsedRows, ScrapeResult, has_class, parse_size
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Precompiled XPath expressions for the lxml parser engine
+_ROWS = etree.XPath(f"//table[{has_class('table-list')}]//tbody//tr")
+_NAME_COL = etree.XPath(f"(.//td[{has_class('name')}])[1]")
+_LINKS = etree.XPath(".//a")
+_SEEDS = etree.XPath(f"(.//td[{has_class('seeds')}])[1]")
+_SIZE = etree.XPath(f"(.//td[{has_class('size')}])[1]")
+_DETAIL_MAGNET = etree.XPath("(//a[starts-with(@href, 'magnet:')]/@href)[1]", smart_strings=False)
 
 class X1337Scraper(BaseScraper):
     def __init__(self, session, user_agent, proxy=None):
         super().__init__(session, user_agent, proxy)
         self.site_name = "1337x"
-        self.base_url = "https://1337x.to"
+        self.base_url = settings.X1337_URL
 
     async def _get_magnet_link(self, torrent_url: str) -> str | None:
         """
         1337x doesn't list magnets in the search results.
         We must fetch the detail page for each result to get the magnet.
-        This is slower, so we only do it for the top few matches.
+        This is slower, so we only do it for the top few matches (in parallel).
         """
         # Fix URL if relative
         if torrent_url.startswith("/"):
             torrent_url = f"{self.base_url}{torrent_url}"
             
-        soup = await self.get_soup(torrent_url)
-        if not soup:
+        html = await self.fetch_html(torrent_url)
+        if not html:
             return None
             
-        # Magnet link is usually in a predefined list or button
-        # Look for a[href^="magnet:"]
-        magnet_tag = soup.select_one("a[href^='magnet:']")
-        if magnet_tag:
-            return magnet_tag["href"]
-            
-        return None
+        return await self.parse_page(parse_detail_page_lxml, parse_detail_page, html)
 
     async def scrape(self, query: str) -> List[ScrapeResult]:
         """
@@ -40,74 +47,171 @@ class X1337Scraper(BaseScraper):
         """
         search_url = f"{self.base_url}/category-search/{query}/XXX/1/"
         
-        soup = await self.get_soup(search_url)
-        if not soup:
+        html = await self.fetch_html(search_url)
+        if not html:
             return []
 
+        # Parsing is CPU-bound, run it in the parser pool
+        candidates = await self.parse_page(
+            parse_search_page_lxml, parse_search_page, html, self.site_name, settings.X1337_DETAIL_PAGES
+        ) or []
+
+        # 4. Get Magnets (Sub-requests)
+        # Fetched concurrently; the per-site limiter in fetch_html bounds parallelism
+        magnets = await asyncio.gather(
+            *(self._get_magnet_link(detail_href) for _, detail_href, _, _ in candidates),
+            return_exceptions=True
+        )
+
         results = []
+        for (title, _, seeders, size), magnet in zip(candidates, magnets):
+            if not magnet or isinstance(magnet, Exception):
+                continue
+
+            # 5. Extract Hash
+            hash_match = HASH_RE.search(magnet)
+            if not hash_match:
+                continue
+            infohash = hash_match.group(1).lower()
+
+            results.append(ScrapeResult(
+                title=title,
+                infohash=infohash,
+                magnet=magnet,
+                seeders=seeders,
+                size=size,
+                source=self.site_name
+            ))
+
+        logger.info(f"[{self.site_name}] Found {len(results)} results for '{query}'")
+        return results
+
+
+def parse_search_page(html: str, site_name: str, limit: int) -> List[Tuple[str, str, int, int]]:
+    """
+    Parse a 1337x search results page into (title, detail_href, seeders, size) rows
+    with BeautifulSoup.
+    Module-level so it can run in the parser pool (threads or processes).
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "lxml")
+    candidates = []
+    
+    try:
+        # Table rows in tbody
+        rows = soup.select("table.table-list tbody tr")
         
-        try:
-            # Table rows in tbody
-            rows = soup.select("table.table-list tbody tr")
-            
-            # Limit to top 5 to avoid too many sub-requests for magnets
-            for row in rows[:5]:
-                try:
-                    # 1. Title and Detail URL
-                    # The title is in the second 'a' tag inside class 'name'
-                    name_col = row.select_one("td.name")
-                    if not name_col:
-                        continue
-                        
-                    links = name_col.select("a")
-                    if len(links) < 2:
-                        continue
-                        
-                    # links[1] is usually the torrent link, links[0] is icon?
-                    detail_href = links[1]["href"]
-                    title = links[1].text.strip()
-
-                    # 2. Seeders (td class 'seeds')
-                    seeds_tag = row.select_one("td.seeds")
-                    seeders = int(seeds_tag.text.strip()) if seeds_tag else 0
-
-                    # 3. Size (td class 'size')
-                    size_tag = row.select_one("td.size")
-                    size = 0
-                    if size_tag:
-                        # Format: "1.2 GB <span..." -> get just text node
-                        size_text = size_tag.contents[0].strip() if size_tag.contents else ""
-                        if "GB" in size_text:
-                            size = int(float(size_text.replace("GB", "").strip()) * 1024**3)
-                        elif "MB" in size_text:
-                            size = int(float(size_text.replace("MB", "").strip()) * 1024**2)
-
-                    # 4. Get Magnet (Sub-request)
-                    magnet = await self._get_magnet_link(detail_href)
-                    if not magnet:
-                        continue
-
-                    # 5. Extract Hash
-                    hash_match = re.search(r"btih:([a-zA-Z0-9]{40})", magnet)
-                    if not hash_match:
-                        continue
-                    infohash = hash_match.group(1).lower()
-
-                    results.append(ScrapeResult(
-                        title=title,
-                        infohash=infohash,
-                        magnet=magnet,
-                        seeders=seeders,
-                        size=size,
-                        source=self.site_name
-                    ))
+        # Limit to the top `limit` rows to bound sub-requests for magnets
+        for row in rows[:limit]:
+            try:
+                # 1. Title and Detail URL
+                # The title is in the second 'a' tag inside class 'name'
+                name_col = row.select_one("td.name")
+                if not name_col:
+                    continue
                     
-                except Exception as e:
-                    logger.debug(f"[{self.site_name}] Error parsing row: {e}")
+                links = name_col.select("a")
+                if len(links) < 2:
                     continue
+                    
+                # links[1] is usually the torrent link, links[0] is icon?
+                detail_href = links[1]["href"]
+                title = links[1].text.strip()
+
+                # 2. Seeders (td class 'seeds')
+                seeds_tag = row.select_one("td.seeds")
+                seeders = int(seeds_tag.text.strip()) if seeds_tag else 0
+
+                # 3. Size (td class 'size')
+                size_tag = row.select_one("td.size")
+                size = 0
+                if size_tag:
+                    # Format: "1.2 GB <span..." -> get just text node
+                    size_text = size_tag.contents[0].strip() if size_tag.contents else ""
+                    size = parse_size(size_text)
+
+                candidates.append((title, detail_href, seeders, size))
+                
+            except Exception as e:
+                logger.debug(f"[{site_name}] Error parsing row: {e}")
+                continue
+
+    except Exception as e:
+        logger.error(f"[{site_name}] Parse error: {e}")
+
+    return candidates
+
+
+def parse_detail_page(html: str) -> Optional[str]:
+    """
+    Extract the magnet link from a 1337x torrent detail page with BeautifulSoup.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "lxml")
+
+    # Magnet link is usually in a predefined list or button
+    # Look for a[href^="magnet:"]
+    magnet_tag = soup.select_one("a[href^='magnet:']")
+    if magnet_tag:
+        return magnet_tag["href"]
+        
+    return None
+
+
+def parse_search_page_lxml(html: str, site_name: str, limit: int) -> Optional[ParsedRows]:
+    """
+    Parse a 1337x search results page with precompiled lxml XPath expressions.
+    """
+    root = etree.HTML(html)
+    if root is None:
+        return None
+
+    rows = _ROWS(root)[:limit]
+    candidates = []
+
+    for row in rows:
+        try:
+            # 1. Title and Detail URL (second link of the name column)
+            name_cols = _NAME_COL(row)
+            if not name_cols:
+                continue
+
+            links = _LINKS(name_cols[0])
+            if len(links) < 2:
+                continue
+
+            detail_href = links[1].get("href")
+            if not detail_href:
+                continue
+            title = "".join(links[1].itertext()).strip()
+
+            # 2. Seeders
+            seeds = _SEEDS(row)
+            seeders = int("".join(seeds[0].itertext()).strip()) if seeds else 0
+
+            # 3. Size: just the leading text node ("1.2 GB <span...")
+            size_cells = _SIZE(row)
+            size = parse_size(size_cells[0].text or "") if size_cells else 0
+
+            candidates.append((title, detail_href, seeders, size))
 
         except Exception as e:
-            logger.error(f"[{self.site_name}] Parse error: {e}")
+            logger.debug(f"[{site_name}] Error parsing row: {e}")
+            continue
 
-        logger.info(f"[{self.site_name}] Found {len(results)} results for '{query}'")
-        return results
+    return ParsedRows(candidates, len(rows))
+
+
+def parse_detail_page_lxml(html: str) -> Optional[str]:
+    """
+    Extract the magnet link from a 1337x torrent detail page with lxml.
+    Returns None when no magnet is found, so BeautifulSoup gets a second look.
+    """
+    root = etree.HTML(html)
+    if root is None:
+        return None
+
+    magnets = _DETAIL_MAGNET(root)
+    return magnets[0] if magnets else None
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from fastapi import BackgroundTasks
+
+from creamio.core.metrics import CACHE_LOOKUPS, SCRAPES_IN_FLIGHT
+from creamio.core.settings import get_settings
+from creamio.core.singleflight import SingleFlight
+from creamio.core.timing import stage
+from creamio.db.database import (
+    get_cached_search,
+    get_cached_search_entry,
+    cache_search_results,
+    get_cached_scene,
+    cache_scene,
+)
+from creamio.services.scrapers.base import ScrapeResult
+from creamio.services.scrapers.manager import ScraperManager
+from creamio.services.stashdb import get_stashdb_client
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Concurrent identical lookups share one upstream call per key.
+# scene_flights is keyed on the StashDB scene id, search_flights on the query.
+scene_flights = SingleFlight("scene")
+search_flights = SingleFlight("search")
+
+# Strong references to fire-and-forget refresh tasks (asyncio only keeps weak ones)
+_background_tasks: set = set()
+
+# Raw results gathered so far by each in-flight scrape, keyed on the query.
+# Lets a request whose deadline fired answer with what the fast sites found.
+_partial_results: Dict[str, List[ScrapeResult]] = {}
+
+
+def build_search_query(scene: Dict[str, Any]) -> str:
+    """
+    Build the torrent search query for a StashDB scene.
+    Short titles are padded with performer names to make them searchable.
+    """
+    query = scene['title']
+    if len(query) < 10 and scene.get("performers"):
+        query += " " + " ".join([p["name"] for p in scene["performers"]])
+    return query
+
+
+async def lookup_scene(scene_id: str) -> Optional[Dict[str, Any]]:
+    """
+    StashDB scene lookup backed by the scene cache (memory LRU -> SQLite -> GraphQL).
+    Concurrent misses for the same scene share a single GraphQL request.
+    """
+    with stage("scene-cache"):
+        scene = await get_cached_scene(scene_id)
+    if scene is not None:
+        logger.debug(f"[Scene] Cache Hit for {scene_id}")
+        return scene
+
+    with stage("stashdb"):
+        return await scene_flights.do(scene_id, lambda: _fetch_scene(scene_id))
+
+
+async def _fetch_scene(scene_id: str) -> Optional[Dict[str, Any]]:
+    scene = await get_stashdb_client().get_scene(scene_id)
+    if scene:
+        await cache_scene(scene_id, scene)
+    return scene
+
+
+async def search_torrents(
+    query: str,
+    background_tasks: Optional[BackgroundTasks] = None,
+    timeout: Optional[float] = None
+) -> List[Dict[str, Any]]:
+    """
+    Return torrents for a query from search_cache, scraping on a miss.
+    Concurrent misses for the same query share a single scrape.
+
+    With a timeout, a cold scrape that takes longer returns the results of the
+    scrapers that already finished; the rest keep running in the background
+    and the merged result still lands in search_cache for the next request.
+
+    Stale entries (older than CACHE_TTL but within CACHE_STALE_TTL) are returned
+    immediately and refreshed in the background: through FastAPI's
+    BackgroundTasks when given (runs after the response is sent), otherwise
+    as a detached task.
+    """
+    with stage("search-cache"):
+        entry = await get_cached_search_entry(query)
+    # Empty results are not worth serving, treat them as a miss
+    if entry and entry[0]:
+        cached, timestamp = entry
+        if time.time() - timestamp < settings.CACHE_TTL:
+            CACHE_LOOKUPS.labels("search", "hit").inc()
+            logger.info(f"[Search] Cache Hit: {len(cached)} torrents found")
+        else:
+            CACHE_LOOKUPS.labels("search", "stale").inc()
+            logger.info(f"[Search] Stale Hit: {len(cached)} torrents, refreshing in background")
+            if background_tasks is not None:
+                background_tasks.add_task(refresh_search, query)
+            else:
+                task = asyncio.ensure_future(refresh_search(query))
+                _background_tasks.add(task)
+                task.add_done_callback(_background_tasks.discard)
+        return cached
+
+    CACHE_LOOKUPS.labels("search", "miss").inc()
+    if timeout is None:
+        return await search_flights.do(query, lambda: _scrape(query))
+
+    # Start the flight before waiting so the scrape runs (and fills the cache)
+    # even when the budget is already spent and wait_for gives up at once
+    flight = asyncio.ensure_future(search_flights.do(query, lambda: _scrape(query)))
+    _background_tasks.add(flight)
+    flight.add_done_callback(_forget_flight)
+    try:
+        # Cancelling the wait does not cancel the shielded scrape itself
+        return await asyncio.wait_for(asyncio.shield(flight), max(timeout, 0))
+    except asyncio.TimeoutError:
+        partial = ScraperManager.rank(query, list(_partial_results.get(query, [])))
+        logger.info(f"[Search] Deadline hit: returning {len(partial)} partial torrents, scrape continues")
+        return [r.model_dump() for r in partial]
+
+
+def _forget_flight(task: asyncio.Task):
+    _background_tasks.discard(task)
+    # Retrieve the exception so a flight abandoned at the deadline doesn't log noise
+    if not task.cancelled():
+        task.exception()
+
+
+async def refresh_search(query: str):
+    """
+    Re-scrape a query and overwrite its search_cache entry.
+    Shares the single-flight key with cold searches, so a refresh and a
+    concurrent miss never scrape the same query twice.
+    """
+    try:
+        await search_flights.do(query, lambda: _scrape(query))
+    except Exception as e:
+        logger.error(f"[Search] Background refresh failed for '{query}': {e}")
+
+
+async def _scrape(query: str) -> List[Dict[str, Any]]:
+    # A flight that just finished may have filled the cache since our lookup
+    cached = await get_cached_search(query)
+    if cached:
+        return cached
+
+    logger.info("[Search] Cache Miss: Starting Scrapers...")
+    sink = _partial_results[query] = []
+    try:
+        with SCRAPES_IN_FLIGHT.track_inprogress():
+            scrape_results = await ScraperManager().search(query, sink=sink)
+    finally:
+        _partial_results.pop(query, None)
+    torrents = [r.model_dump() for r in scrape_results]
+    # Empty results are treated as a miss on read anyway; skipping them also
+    # keeps a site outage from overwriting stale-but-good results
+    if torrents:
+        await cache_search_results(query, torrents)
+    logger.info(f"[Search] Scraped {len(torrents)} new torrents")
+    return torrents
@@ -1,20 +1,184 @@
+import asyncio
 import logging
+from functools import lru_cache
 from typing import Any, Dict, List, Optional
 
+import aiohttp
 from gql import Client, gql
+from gql.client import AsyncClientSession
 from gql.transport.aiohttp import AIOHTTPTransport
 
+from creamio.core.cache import TTLCache
+from creamio.core.http import get_http_session
+from creamio.core.metrics import register_upstream
 from creamio.core.settings import get_settings
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+register_upstream(settings.STASHDB_ENDPOINT, "StashDB")
+
+
+class PooledAIOHTTPTransport(AIOHTTPTransport):
+    """
+    AIOHTTPTransport that borrows the process-wide pooled session
+    instead of opening (and tearing down) its own for every query.
+    """
+
+    def __init__(self, session: aiohttp.ClientSession, **kwargs):
+        super().__init__(**kwargs)
+        self._pooled_session = session
+
+    async def connect(self) -> None:
+        # Idempotent so several queries can share one transport concurrently
+        self.session = self._pooled_session
+
+    async def close(self) -> None:
+        # The pooled session belongs to the app lifespan, never close it here
+        pass
+
+    async def execute(self, document, variable_values=None, operation_name=None, extra_args=None, upload_files=False):
+        # Headers normally live on the transport's own session; send them per request instead
+        extra_args = {"headers": self.headers, **(extra_args or {})}
+        return await super().execute(
+            document,
+            variable_values=variable_values,
+            operation_name=operation_name,
+            extra_args=extra_args,
+            upload_files=upload_files
+        )
+
+
+# Query documents are parsed once at import instead of on every call.
+
+# Scene fields shared by every scene query, so cached scenes have one shape
+SCENE_FIELDS = """
+fragment SceneFields on Scene {
+    id
+    title
+    details
+    date
+    release_date
+    duration
+    images {
+        url
+        width
+        height
+    }
+    studio {
+        name
+    }
+    performers {
+        name
+    }
+}
+"""
+
+SEARCH_SCENES_QUERY = gql("""
+query SearchScenes($term: String!, $page: Int!) {
+    findScenes(
+        scene_filter: {
+            search: $term,
+            sort: DATE,
+            direction: DESC
+        }
+        filter: {
+            page: $page,
+            per_page: 20
+        }
+    ) {
+        scenes {
+            ...SceneFields
+        }
+    }
+}
+""" + SCENE_FIELDS)
+
+GET_SCENE_QUERY = gql("""
+query GetScene($id: ID!) {
+    findScene(id: $id) {
+        ...SceneFields
+    }
+}
+""" + SCENE_FIELDS)
+
+# Performer lookup and the title-search fallback in one request: when the
+# term isn't a performer, the fallback results are already here. When it is,
+# the performer's scenes need a second request and the fallback page is only
+# used if that comes back empty.
+FIND_PERFORMER_OR_SCENES_QUERY = gql("""
+query FindPerformerOrScenes($name: String!, $page: Int!) {
+    findPerformers(
+        performer_filter: { search: $name }
+        filter: { per_page: 1 }
+    ) {
+        performers {
+            id
+            name
+        }
+    }
+    findScenes(
+        scene_filter: {
+            search: $name,
+            sort: DATE,
+            direction: DESC
+        }
+        filter: {
+            page: $page,
+            per_page: 20
+        }
+    ) {
+        scenes {
+            ...SceneFields
+        }
+    }
+}
+""" + SCENE_FIELDS)
+
+PERFORMER_SCENES_QUERY = gql("""
+query PerformerScenes($pid: ID!, $page: Int!) {
+    findScenes(
+        scene_filter: {
+            performers: { value: [$pid], modifier: INCLUDES_ALL }
+            sort: DATE
+            direction: DESC
+        }
+        filter: {
+            page: $page,
+            per_page: 20
+        }
+    ) {
+        scenes {
+            ...SceneFields
+        }
+    }
+}
+""" + SCENE_FIELDS)
+
+
+@lru_cache(maxsize=None)
+def batch_scenes_query(size: int):
+    """
+    Aliased query fetching `size` scenes by id in one request:
+    s0: findScene(id: $id0) ... s1: findScene(id: $id1) ...
+    Compiled once per batch size.
+    """
+    params = ", ".join(f"$id{i}: ID!" for i in range(size))
+    fields = "\n".join(f"    s{i}: findScene(id: $id{i}) {{ ...SceneFields }}" for i in range(size))
+    return gql(f"query GetScenes({params}) {{\n{fields}\n}}\n" + SCENE_FIELDS)
+
+
+# Normalized performer name -> StashDB performer id ("" = not a performer).
+# Lets repeated performer searches skip the lookup entirely.
+performer_id_cache = TTLCache("performer", maxsize=settings.STASHDB_PERFORMER_CACHE_SIZE, ttl=settings.STASHDB_PERFORMER_CACHE_TTL)
+
+
 class StashDBClient:
     """
     Async client for interacting with the StashDB GraphQL API.
     """
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, session: Optional[aiohttp.ClientSession] = None):
         # Use user-provided API key if available, otherwise fallback to server settings
         self.api_key = api_key or settings.STASHDB_API_KEY
         self.endpoint = settings.STASHDB_ENDPOINT
@@ -24,20 +188,40 @@ class StashDBClient:
         if self.api_key:
             headers["ApiKey"] = self.api_key
 
-        # Initialize GraphQL transport
-        self.transport = AIOHTTPTransport(
+        # Initialize GraphQL transport on top of the shared pooled session
+        self.transport = PooledAIOHTTPTransport(
+            session or get_http_session(),
             url=self.endpoint, 
             headers=headers
         )
+        self.client = Client(transport=self.transport, fetch_schema_from_transport=False)
+        # Opened on first use and reused by every query of this client;
+        # the lock keeps concurrent first queries from connecting twice
+        self._session: Optional[AsyncClientSession] = None
+        self._connect_lock = asyncio.Lock()
+
+    async def _get_session(self) -> AsyncClientSession:
+        if self._session is None:
+            async with self._connect_lock:
+                if self._session is None:
+                    self._session = await self.client.connect_async()
+        return self._session
 
-    async def _execute_query(self, query_str: str, variables: Dict[str, Any]) -> Dict[str, Any]:
+    async def close(self):
         """
-        Helper to execute a GraphQL query safely.
+        Close the gql session (the pooled HTTP session is left open).
+        """
+        if self._session is not None:
+            self._session = None
+            await self.client.close_async()
+
+    async def _execute_query(self, query, variables: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Helper to execute a precompiled GraphQL query safely.
         """
         try:
-            async with Client(transport=self.transport, fetch_schema_from_transport=False) as session:
-                query = gql(query_str)
-                return await session.execute(query, variable_values=variables)
+            session = await self._get_session()
+            return await session.execute(query, variable_values=variables)
         except Exception as e:
             logger.error(f"StashDB Query Failed: {e}")
             return {}
@@ -46,44 +230,8 @@ class StashDBClient:
         """
         Search for scenes by keyword (fuzzy match).
         """
-        query = """
-        query SearchScenes($term: String!, $page: Int!) {
-            findScenes(
-                scene_filter: {
-                    search: $term,
-                    sort: DATE,
-                    direction: DESC
-                }
-                filter: {
-                    page: $page,
-                    per_page: 20
-                }
-            ) {
-                scenes {
-                    id
-                    title
-                    details
-                    date
-                    release_date
-                    duration
-                    images {
-                        url
-                        width
-                        height
-                    }
-                    studio {
-                        name
-                    }
-                    performers {
-                        name
-                    }
-                }
-            }
-        }
-        """
-        
         variables = {"term": search_term, "page": page}
-        result = await self._execute_query(query, variables)
+        result = await self._execute_query(SEARCH_SCENES_QUERY, variables)
         
         # Safety check for empty results
         if not result or "findScenes" not in result:
@@ -95,92 +243,129 @@ class StashDBClient:
         """
         Get details for a specific scene by ID.
         """
-        query = """
-        query GetScene($id: ID!) {
-            findScene(id: $id) {
-                id
-                title
-                details
-                date
-                release_date
-                duration
-                images {
-                    url
-                }
-                studio {
-                    name
-                }
-                performers {
-                    name
-                }
-            }
-        }
-        """
-        
         variables = {"id": scene_id}
-        result = await self._execute_query(query, variables)
+        result = await self._execute_query(GET_SCENE_QUERY, variables)
         
         return result.get("findScene")
 
+    async def get_scenes(self, scene_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Get details for many scenes by ID, STASHDB_BATCH_SIZE per aliased request.
+        
+        Returns:
+            Dict of scene id -> scene. Unknown ids (and failed batches) are absent.
+        """
+        ids = list(dict.fromkeys(scene_ids))
+        size = settings.STASHDB_BATCH_SIZE
+        chunks = [ids[i:i+size] for i in range(0, len(ids), size)]
+        results = await asyncio.gather(*(
+            self._execute_query(
+                batch_scenes_query(len(chunk)),
+                {f"id{i}": scene_id for i, scene_id in enumerate(chunk)}
+            )
+            for chunk in chunks
+        ))
+
+        scenes = {}
+        for result in results:
+            for scene in result.values():
+                if scene:
+                    scenes[scene["id"]] = scene
+        return scenes
+
     async def get_performer_scenes(self, performer_name: str, page: int = 1) -> List[Dict[str, Any]]:
         """
         Find a performer by name, then get their scenes.
-        This is a two-step process in GraphQL logic usually, but StashDB 
-        allows filtering scenes by performer_id if we find them.
+        Empty if no performer matches (see search_performer_or_scenes).
         """
-        # 1. Find the performer ID
-        performer_query = """
-        query FindPerformer($name: String!) {
-            findPerformers(
-                performer_filter: { search: $name }
-                filter: { per_page: 1 }
-            ) {
-                performers {
-                    id
-                    name
-                }
-            }
-        }
+        scenes, is_performer = await self.search_performer_or_scenes(performer_name, page)
+        return scenes if is_performer else []
+
+    async def search_performer_or_scenes(self, term: str, page: int = 1) -> tuple[List[Dict[str, Any]], bool]:
         """
-        p_result = await self._execute_query(performer_query, {"name": performer_name})
-        performers = p_result.get("findPerformers", {}).get("performers", [])
+        Scenes of the performer matching `term`, or the title search results
+        for `term` if it isn't a performer or that performer has no scenes.
+
+        The performer id is cached by name, so repeated searches are a single
+        request. On a cache miss the performer lookup is sent together with
+        the title search, so a term that isn't a performer is one round trip.
+        The first search for a performer still costs two requests, and the
+        title-search page fetched alongside the lookup goes unused unless
+        the performer's page comes back empty.
         
-        if not performers:
-            return []
-            
-        performer_id = performers[0]["id"]
+        Returns:
+            (scenes, is_performer)
+        """
+        key = " ".join(term.split()).casefold()
+        performer_id = performer_id_cache.get(key)
+        fallback = None
+
+        if performer_id is None:
+            # 1. Find the performer ID (and the title-search fallback alongside it)
+            result = await self._execute_query(FIND_PERFORMER_OR_SCENES_QUERY, {"name": term, "page": page})
+            if not result:
+                return [], False
+
+            fallback = result.get("findScenes", {}).get("scenes", [])
+            performers = result.get("findPerformers", {}).get("performers", [])
+            if not performers:
+                # Cache the miss too ("" never matches a real id)
+                performer_id_cache.set(key, "")
+                return fallback, False
+            performer_id = performers[0]["id"]
+            performer_id_cache.set(key, performer_id)
+
+        elif not performer_id:
+            return await self.search_scenes(term, page=page), False
 
         # 2. Find scenes for this performer
-        scenes_query = """
-        query PerformerScenes($pid: ID!, $page: Int!) {
-            findScenes(
-                scene_filter: {
-                    performers: { value: [$pid], modifier: INCLUDES_ALL }
-                    sort: DATE
-                    direction: DESC
-                }
-                filter: {
-                    page: $page,
-                    per_page: 20
-                }
-            ) {
-                scenes {
-                    id
-                    title
-                    details
-                    date
-                    images {
-                        url
-                    }
-                    studio {
-                        name
-                    }
-                }
-            }
-        }
-        """
-        
         variables = {"pid": performer_id, "page": page}
-        result = await self._execute_query(scenes_query, variables)
-        
-        return result.get("findScenes", {}).get("scenes", [])
+        result = await self._execute_query(PERFORMER_SCENES_QUERY, variables)
+        scenes = result.get("findScenes", {}).get("scenes", [])
+        if scenes:
+            return scenes, True
+
+        # Performer search is fuzzy: a match with no scenes falls back to titles
+        if fallback is None:
+            fallback = await self.search_scenes(term, page=page)
+        return fallback, False
+
+
+# The process-wide StashDB client.
+# Created once in the app lifespan (after the pooled HTTP session) so every
+# request shares one gql session instead of connecting its own.
+_client: Optional[StashDBClient] = None
+
+
+async def init_stashdb_client():
+    """
+    Create the shared StashDB client.
+    This is called when the addon starts.
+    """
+    global _client
+    if _client is None:
+        _client = StashDBClient()
+
+
+async def close_stashdb_client():
+    """
+    Close the shared StashDB client.
+    Called when the addon shuts down, before the HTTP session.
+    """
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+def get_stashdb_client() -> StashDBClient:
+    """
+    Return the shared StashDB client.
+
+    Falls back to creating it lazily so that scripts running outside the
+    FastAPI lifespan still work. Must be called from inside a running loop.
+    """
+    global _client
+    if _client is None:
+        _client = StashDBClient()
+    return _client
@@ -0,0 +1,70 @@
+"""
+Gunicorn configuration for production.
+
+    gunicorn main:app -c gunicorn.conf.py
+
+Runs one uvicorn worker (uvloop + httptools) per CPU core. All workers share
+the SQLite cache file (WAL) or Redis, and only one of them runs the
+background jobs (see creamio/core/leader.py).
+"""
+import glob
+import multiprocessing
+import os
+import tempfile
+
+from creamio.core.settings import get_settings
+
+settings = get_settings()
+
+# Every worker keeps its own metrics; they are aggregated on /metrics through
+# files in this directory. Set here, before the app (and prometheus_client) is
+# preloaded, and emptied on every launch.
+os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR",
+    os.path.join(tempfile.gettempdir(), f"creamio-metrics-{settings.PORT}")
+)
+_metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+os.makedirs(_metrics_dir, exist_ok=True)
+for _path in glob.glob(os.path.join(_metrics_dir, "*.db")):
+    os.remove(_path)
+
+bind = f"{settings.HOST}:{settings.PORT}"
+
+# Async workers: one per core is enough to saturate it
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.environ.get("WEB_CONCURRENCY", 0)) or multiprocessing.cpu_count()
+
+# Import the app once in the master; workers fork from it (faster boot, shared pages)
+preload_app = True
+
+# Recycle workers periodically to bound memory growth, staggered so they
+# don't all restart at once
+max_requests = 10000
+max_requests_jitter = 1000
+
+# Streams can take a while; give in-flight requests time to finish on restart
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+
+loglevel = settings.LOG_LEVEL.lower()
+accesslog = "-"
+
+
+def on_starting(server):
+    """
+    Create the database schema once, in the master, before any worker starts.
+    Workers inherit the 'schema ready' flag through preload_app and skip it.
+    """
+    from creamio.db.database import prepare_schema
+
+    prepare_schema()
+
+
+def child_exit(server, worker):
+    """
+    Drop a dead worker's live gauges from the aggregated metrics.
+    """
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import sys
 from contextlib import asynccontextmanager
@@ -8,7 +9,14 @@ from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
 from creamio.core.settings import get_settings
-from creamio.db.database import init_db, close_db
+from creamio.core.http import init_http_client, close_http_client
+from creamio.core.leader import run_as_leader
+from creamio.core.metrics import track_requests
+from creamio.core.timing import server_timing
+from creamio.core.workers import shutdown_parser_pool
+from creamio.db.database import init_db, close_db, cache_janitor
+from creamio.services.catalog import trending_refresher
+from creamio.services.stashdb import init_stashdb_client, close_stashdb_client
 from creamio.api.routes import router
 
 # Configure Logging
@@ -24,13 +32,28 @@ settings = get_settings()
 async def lifespan(app: FastAPI):
     """
     Lifecycle manager:
-    - Connect to DB on startup
-    - Disconnect on shutdown
+    - Connect to DB, open the pooled HTTP and StashDB clients and start background jobs on startup
+    - Stop / disconnect / close them on shutdown
     """
     logging.info("Starting Creamio Addon...")
     await init_db()
+    await init_http_client()
+    await init_stashdb_client()
+    # With several workers only the elected one runs the background jobs
+    jobs = asyncio.create_task(run_as_leader([trending_refresher, cache_janitor]))
     yield
     logging.info("Shutting down Creamio Addon...")
+    jobs.cancel()
+    try:
+        await jobs
+    except asyncio.CancelledError:
+        pass
+    except Exception as e:
+        # Never skip closing the client, parser pool and database below
+        logging.error(f"Background jobs failed: {e}")
+    await close_stashdb_client()
+    await close_http_client()
+    shutdown_parser_pool()
     await close_db()
 
 app = FastAPI(
@@ -49,6 +72,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route request metrics (see /metrics)
+app.middleware("http")(track_requests)
+
+# Per-stage Server-Timing header on /stream and /catalog
+app.middleware("http")(server_timing)
+
 # Mount static files (if we add CSS/JS later)
 # app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -56,9 +85,10 @@ app.add_middleware(
 app.include_router(router)
 
 if __name__ == "__main__":
+    # Development server. In production run gunicorn (see gunicorn.conf.py)
     uvicorn.run(
         "main:app", 
         host=settings.HOST, 
         port=settings.PORT, 
-        reload=True
+        reload=settings.DEBUG
     )